@@ -0,0 +1,148 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import Exacto
+import MinConflictos
+from MultiInicio import loadNReinas
+
+# Banco de pruebas de los solucionadores de N reinas.
+# Para cada solucionador, tamaño de tablero y semilla se mide el tiempo
+#   de reloj, las iteraciones, los vecinos evaluados por segundo, si se
+#   llego a 0 colisiones y la memoria pico. Los resultados se guardan en
+#   CSV y JSON para comparar el ciclo de busqueda entre versiones.
+
+# Tamaño maximo para el que se calcula el numero exacto de soluciones
+#   con Exacto.py (sirve para saber si el tablero tiene solucion)
+MAX_EXACT = 12
+
+# Corre un solucionador y regresa (tablero, pasos, vecinos evaluados)
+# Solucionadores disponibles:
+# tabu: tabu con swaps adyacentes
+# tabu-full: tabu con vecindario completo (muestra de hasta 20000 pares)
+# minconflicts: min-conflictos de MinConflictos.py
+def runSolver(solver, N, seed):
+    stats = {}
+
+    if solver == "tabu":
+        (chess, steps) = loadNReinas().tabu(N, seed=seed, stats=stats)
+    elif solver == "tabu-full":
+        sampleSize = min(20000, N * (N - 1) // 2)
+        (chess, steps) = loadNReinas().tabu(N, "full", sampleSize, seed=seed, stats=stats)
+    elif solver == "minconflicts":
+        (chess, steps) = MinConflictos.minConflicts(N, seed=seed, stats=stats)
+    else:
+        raise ValueError(f"Solucionador desconocido: {solver}")
+
+    return (chess, steps, stats["evaluations"])
+
+# Corre un caso del banco de pruebas y regresa sus metricas
+# Se ejecuta en un proceso nuevo por caso para que la memoria pico
+#   (ru_maxrss) corresponda solo a ese caso
+def runCase(solver, N, seed):
+    # Cargamos N-Reinas.py antes de medir para no contar la importacion
+    loadNReinas()
+
+    start = time.perf_counter()
+    (chess, steps, evaluations) = runSolver(solver, N, seed)
+    wallTime = time.perf_counter() - start
+
+    # Las colisiones se recalculan con targetFunction en lugar de
+    # confiar en el registro del solucionador
+    colissions = loadNReinas().targetFunction(chess, N)
+    isPermutation = sorted(chess) == list(range(1, N + 1))
+
+    peakMemory = None
+    if resource is not None:
+        # ru_maxrss esta en KB en Linux y en bytes en macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peakMemory = maxrss / 1024 if sys.platform != "darwin" else maxrss / (1024 * 1024)
+
+    return {
+        "solver": solver,
+        "N": N,
+        "seed": seed,
+        "wall_time": wallTime,
+        "iterations": len(steps) - 1,
+        "evaluations": evaluations,
+        "evaluations_per_second": evaluations / wallTime if wallTime > 0 else None,
+        "colissions": colissions,
+        "success": isPermutation and colissions == 0,
+        "peak_memory_mb": peakMemory,
+    }
+
+# Corre el barrido completo de solucionadores, tamaños y semillas
+# Parametros de entrada:
+# solvers: Lista de solucionadores a medir
+# sizes: Lista de tamaños de tablero
+# seeds: Lista de semillas (las mismas para cada tamaño)
+# Retorna:
+# (results, summary): metricas por caso y resumen por solucionador y N
+def runBenchmark(solvers, sizes, seeds):
+    results = []
+
+    for solver in solvers:
+        for N in sizes:
+            for seed in seeds:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(runCase, solver, N, seed).result()
+                results.append(result)
+                print(f"{solver:>12} N={N:<7} semilla={seed:<3} "
+                      f"tiempo={result['wall_time']:.3f}s colisiones={result['colissions']}")
+
+    summary = []
+    for solver in solvers:
+        for N in sizes:
+            cases = [r for r in results if r["solver"] == solver and r["N"] == N]
+            summary.append({
+                "solver": solver,
+                "N": N,
+                "runs": len(cases),
+                "success_rate": sum(r["success"] for r in cases) / len(cases),
+                "mean_wall_time": sum(r["wall_time"] for r in cases) / len(cases),
+                "mean_iterations": sum(r["iterations"] for r in cases) / len(cases),
+                "mean_evaluations_per_second": sum(r["evaluations_per_second"] or 0 for r in cases) / len(cases),
+                "max_peak_memory_mb": max((r["peak_memory_mb"] or 0) for r in cases),
+                "exact_solutions": Exacto.countSolutions(N, workers=1) if N <= MAX_EXACT else None,
+            })
+
+    return (results, summary)
+
+# Guarda los resultados en <prefix>.csv (un renglon por caso) y en
+#   <prefix>.json (casos y resumen)
+def saveResults(prefix, results, summary):
+    with open(prefix + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+    with open(prefix + ".json", "w") as f:
+        json.dump({"results": results, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banco de pruebas de N reinas")
+    parser.add_argument("--solvers", nargs="+", default=["tabu", "tabu-full", "minconflicts"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[8, 16, 64, 256, 1000, 10000, 100000])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2, 3, 4])
+    parser.add_argument("--output", default="benchmark")
+    args = parser.parse_args()
+
+    (results, summary) = runBenchmark(args.solvers, args.sizes, args.seeds)
+    saveResults(args.output, results, summary)
+
+    print()
+    for row in summary:
+        exact = "" if row["exact_solutions"] is None else f" (soluciones exactas: {row['exact_solutions']})"
+        print(f"{row['solver']:>12} N={row['N']:<7} exito={row['success_rate']:.0%} "
+              f"tiempo={row['mean_wall_time']:.3f}s "
+              f"evaluaciones/s={row['mean_evaluations_per_second']:.0f} "
+              f"memoria={row['max_peak_memory_mb']:.1f}MB{exact}")
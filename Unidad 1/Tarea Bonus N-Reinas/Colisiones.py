@@ -0,0 +1,158 @@
+from array import array
+
+# NumPy solo es necesario para evaluar vecindarios completos en bloque
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Clase que mantiene vivos los contadores de diagonales de un tablero
+#   para poder evaluar swaps en O(1) en lugar de recalcular todas las
+#   colisiones con targetFunction (O(N)) por cada vecino.
+# La representacion es la misma que en N-Reinas.py: chess[i] es la
+#   columna (1..N) de la reina del renglon i + 1, por lo que
+#   diag = x + y y diag2 = (x - y) + N
+class Colisiones:
+
+    # Constructor de la clase Colisiones
+    # Parametros de entrada:
+    # chess: Permutacion de 1 a N que representa el tablero
+    # N: Tamaño del tablero
+    # Atributos:
+    # chess: Copia compacta (array de enteros) del tablero
+    # diags: Numero de reinas en cada diagonal x + y
+    # diags2: Numero de reinas en cada diagonal (x - y) + N
+    # colissions: Numero de colisiones actual del tablero
+    def __init__(self, chess, N):
+        self.N = N
+        self.chess = array('i', chess)
+        self.diags = array('i', bytes(4 * (2 * N + 1)))
+        self.diags2 = array('i', bytes(4 * (2 * N)))
+        self.colissions = 0
+
+        diags = self.diags
+        diags2 = self.diags2
+        colissions = 0
+        for i in range(N):
+            x = i + 1
+            y = self.chess[i]
+            diag = x + y
+            diag2 = (x - y) + N
+            colissions += diags[diag] + diags2[diag2]
+            diags[diag] += 1
+            diags2[diag2] += 1
+
+        self.colissions = colissions
+
+    # Metodo que calcula el cambio en colisiones si se intercambian las
+    #   reinas de los renglones i y j, sin modificar el tablero
+    # Parametros de entrada:
+    # i, j: Posiciones (base 0) de las reinas a intercambiar
+    # Retorna:
+    # delta: Diferencia de colisiones (nuevas - actuales)
+    # Funcionamiento del metodo:
+    # Solo se consultan las cuatro diagonales que se vacian y las cuatro
+    #   que se llenan. Las reinas nuevas nunca caen en la misma diagonal
+    #   que las que salen (porque x e y son distintos), por lo que los
+    #   unicos casos especiales son cuando ambas reinas comparten una
+    #   diagonal; en ese caso las nuevas comparten la diagonal del otro tipo.
+    def swapDelta(self, i, j):
+        N = self.N
+        chess = self.chess
+        diags = self.diags
+        diags2 = self.diags2
+
+        xa = i + 1
+        xb = j + 1
+        ya = chess[i]
+        yb = chess[j]
+
+        # Diagonales de las que salen las reinas
+        a1 = xa + ya
+        b1 = xb + yb
+        a2 = xa - ya + N
+        b2 = xb - yb + N
+
+        delta = 4 - diags[a1] - diags[b1] - diags2[a2] - diags2[b2]
+        delta += diags[xa + yb] + diags[xb + ya]
+        delta += diags2[xa - yb + N] + diags2[xb - ya + N]
+
+        if a1 == b1:
+            delta += 2
+        if a2 == b2:
+            delta += 2
+
+        return delta
+
+    # Metodo que calcula en una sola pasada vectorizada el cambio en
+    #   colisiones de muchos swaps a la vez (misma formula que swapDelta)
+    # Parametros de entrada:
+    # I, J: Arreglos de NumPy con las posiciones (base 0) de cada swap
+    # Retorna:
+    # deltas: Arreglo con el cambio de colisiones de cada swap
+    # Funcionamiento del metodo:
+    # Los contadores se leen sin copiarse, viendo el buffer de los
+    #   arreglos compactos como arreglos de NumPy.
+    def swapDeltas(self, I, J):
+        if np is None:
+            raise ImportError("Se necesita numpy para evaluar vecindarios en bloque")
+
+        N = self.N
+        chess = np.frombuffer(self.chess, dtype=np.intc)
+        diags = np.frombuffer(self.diags, dtype=np.intc)
+        diags2 = np.frombuffer(self.diags2, dtype=np.intc)
+
+        I = np.asarray(I, dtype=np.int64)
+        J = np.asarray(J, dtype=np.int64)
+        xa = I + 1
+        xb = J + 1
+        ya = chess[I].astype(np.int64)
+        yb = chess[J].astype(np.int64)
+
+        a1 = xa + ya
+        b1 = xb + yb
+        a2 = xa - ya + N
+        b2 = xb - yb + N
+
+        deltas = 4 - diags[a1] - diags[b1] - diags2[a2] - diags2[b2]
+        deltas += diags[xa + yb] + diags[xb + ya]
+        deltas += diags2[xa - yb + N] + diags2[xb - ya + N]
+        deltas += 2 * (a1 == b1) + 2 * (a2 == b2)
+
+        return deltas
+
+    # Metodo que aplica el intercambio de las reinas de los renglones i y j
+    #   actualizando los contadores de diagonales y las colisiones
+    # Parametros de entrada:
+    # i, j: Posiciones (base 0) de las reinas a intercambiar
+    # delta: Cambio de colisiones si ya fue calculado con swapDelta
+    def applySwap(self, i, j, delta=None):
+        if delta is None:
+            delta = self.swapDelta(i, j)
+
+        N = self.N
+        chess = self.chess
+        diags = self.diags
+        diags2 = self.diags2
+
+        xa = i + 1
+        xb = j + 1
+        ya = chess[i]
+        yb = chess[j]
+
+        diags[xa + ya] -= 1
+        diags[xb + yb] -= 1
+        diags2[xa - ya + N] -= 1
+        diags2[xb - yb + N] -= 1
+
+        diags[xa + yb] += 1
+        diags[xb + ya] += 1
+        diags2[xa - yb + N] += 1
+        diags2[xb - ya + N] += 1
+
+        chess[i], chess[j] = yb, ya
+        self.colissions += delta
+
+    # Metodo que regresa una copia del tablero actual como lista
+    def board(self):
+        return self.chess.tolist()
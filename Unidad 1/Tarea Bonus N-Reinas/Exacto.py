@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+
+# Solucionador exacto de N reinas por backtracking con mascaras de bits.
+# Cada renglon se representa con tres enteros:
+# cols: columnas ya ocupadas
+# ld: casillas atacadas por diagonales que bajan hacia la izquierda
+# rd: casillas atacadas por diagonales que bajan hacia la derecha
+# Las casillas libres del renglon son ~(cols | ld | rd), y al pasar al
+#   siguiente renglon las diagonales solo se recorren un bit.
+# Sirve como oraculo para validar a la heuristica: cuenta todas las
+#   soluciones (o las enumera) para N moderados.
+
+# Cuenta las soluciones de un subarbol a partir de un estado parcial
+def countSubtree(N, cols, ld, rd):
+    full = (1 << N) - 1
+    if cols == full:
+        return 1
+
+    count = 0
+    avail = full & ~(cols | ld | rd)
+    while avail:
+        bit = avail & -avail
+        avail ^= bit
+        count += countSubtree(N, cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1)
+
+    return count
+
+# Genera los subarboles independientes que resultan de fijar las reinas
+#   de los primeros renglones, aprovechando la simetria de espejo.
+# Retorna una lista de tuplas (cols, ld, rd, peso): el peso es 2 cuando
+#   el subarbol tiene su reflejo (que no se recorre) y 1 si no lo tiene.
+# Funcionamiento del metodo:
+# La reina del primer renglon solo se coloca en la mitad izquierda del
+#   tablero y esas soluciones se cuentan doble. Si N es impar la columna
+#   central no tiene reflejo distinto en el primer renglon, pero si en el
+#   segundo, asi que ahi solo se usa la mitad izquierda del segundo renglon.
+def subtrees(N, depth=2):
+    full = (1 << N) - 1
+    tasks = []
+
+    for c in range(N // 2):
+        bit = 1 << c
+        tasks.append((bit, (bit << 1) & full, bit >> 1, 2))
+
+    if N % 2 == 1:
+        center = 1 << (N // 2)
+        ld = (center << 1) & full
+        rd = center >> 1
+        for c in range(N // 2):
+            bit = 1 << c
+            if bit & (ld | rd):
+                continue
+            tasks.append((center | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1, 2))
+
+    # Profundizamos un renglon mas para tener mas subarboles que repartir
+    for _ in range(depth - 1):
+        deeper = []
+        for (cols, ld, rd, weight) in tasks:
+            if bin(cols).count("1") >= depth or cols == full:
+                deeper.append((cols, ld, rd, weight))
+                continue
+
+            avail = full & ~(cols | ld | rd)
+            while avail:
+                bit = avail & -avail
+                avail ^= bit
+                deeper.append((cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1, weight))
+        tasks = deeper
+
+    return tasks
+
+# Cuenta las soluciones de un subarbol ya ponderado por su simetria
+def countTask(N, task):
+    (cols, ld, rd, weight) = task
+    return weight * countSubtree(N, cols, ld, rd)
+
+# Cuenta todas las soluciones del tablero de N x N
+# Parametros de entrada:
+# N: Tamaño del tablero
+# workers: Numero de procesos a usar (None usa todos los nucleos,
+#   1 corre todo en el proceso actual)
+# depth: Renglones que se fijan para dividir el arbol en subarboles
+def countSolutions(N, workers=None, depth=2):
+    if N == 1:
+        return 1
+
+    tasks = subtrees(N, depth)
+
+    if workers == 1:
+        return sum(countTask(N, task) for task in tasks)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(countTask, [N] * len(tasks), tasks))
+
+# Genera todas las soluciones del tablero de N x N en el formato de
+#   N-Reinas.py (lista con la columna 1..N de la reina de cada renglon)
+def solutions(N):
+    full = (1 << N) - 1
+    chess = [0] * N
+
+    def place(row, cols, ld, rd):
+        if row == N:
+            yield chess[:]
+            return
+
+        avail = full & ~(cols | ld | rd)
+        while avail:
+            bit = avail & -avail
+            avail ^= bit
+            chess[row] = bit.bit_length()
+            yield from place(row + 1, cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1)
+
+    yield from place(0, 0, 0, 0)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+
+    start = time.time()
+    count = countSolutions(N)
+    print(f"N = {N}, soluciones = {count}, tiempo = {time.time() - start:.2f} s")
@@ -0,0 +1,111 @@
+import mmap
+import struct
+import sys
+from array import array
+
+# Formato binario compacto para guardar soluciones y registros de pasos.
+# El archivo tiene un encabezado de 16 bytes seguido de los valores como
+#   enteros de 32 bits (little endian):
+# magic: b"NQB1"
+# kind: 0 para una solucion (permutacion), 1 para un registro de pasos
+# count: numero de valores guardados
+# Al leerse con mmap los valores se consultan directo del archivo, sin
+#   construir listas de Python, por lo que sirve para tableros de 10^7 reinas.
+
+MAGIC = b"NQB1"
+HEADER = struct.Struct("<4sB3xQ")
+SOLUTION = 0
+STEPS = 1
+
+# Guarda un arreglo de enteros en el formato binario
+# Parametros de entrada:
+# path: Ruta del archivo a escribir
+# values: Lista, array('i') o arreglo de NumPy con los valores
+# kind: SOLUTION o STEPS
+def save(path, values, kind):
+    if not isinstance(values, array) or values.typecode != 'i':
+        values = array('i', values)
+
+    if sys.byteorder == "big":
+        values = array('i', values)
+        values.byteswap()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, kind, len(values)))
+        values.tofile(f)
+
+def saveSolution(path, chess):
+    save(path, chess, SOLUTION)
+
+def saveSteps(path, steps):
+    save(path, steps, STEPS)
+
+# Abre un archivo en el formato binario sin copiarlo a memoria
+# Parametros de entrada:
+# path: Ruta del archivo a leer
+# Retorna:
+# (kind, values): el tipo de archivo y una vista memoryview de enteros
+#   sobre el archivo mapeado (se indexa como una lista)
+def load(path):
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapped) < HEADER.size:
+        raise ValueError(f"{path} no tiene el encabezado completo")
+
+    (magic, kind, count) = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(f"{path} no es un archivo de soluciones de N reinas")
+    if len(mapped) != HEADER.size + 4 * count:
+        raise ValueError(f"{path} esta truncado: se esperaban {count} valores")
+    if sys.byteorder == "big":
+        raise ValueError("La lectura con mmap solo esta soportada en little endian")
+
+    values = memoryview(mapped)[HEADER.size:].cast('i')
+    return (kind, values)
+
+# Valida una solucion guardada con una sola pasada sobre los contadores
+#   de diagonales (la misma idea que targetFunction)
+# Parametros de entrada:
+# path: Ruta del archivo con la solucion
+# Retorna:
+# (isPermutation, colissions): si el tablero es una permutacion de 1 a N
+#   (una reina por columna) y su numero de colisiones en diagonal
+def validate(path):
+    (kind, chess) = load(path)
+    if kind != SOLUTION:
+        raise ValueError(f"{path} no contiene una solucion")
+
+    N = len(chess)
+    seen = bytearray(N + 1)
+    diags = array('i', bytes(4 * (2 * N + 1)))
+    diags2 = array('i', bytes(4 * (2 * N)))
+    isPermutation = True
+    colissions = 0
+
+    for i in range(N):
+        x = i + 1
+        y = chess[i]
+        if y < 1 or y > N or seen[y]:
+            isPermutation = False
+            continue
+        seen[y] = 1
+
+        diag = x + y
+        diag2 = (x - y) + N
+        colissions += diags[diag] + diags2[diag2]
+        diags[diag] += 1
+        diags2[diag2] += 1
+
+    return (isPermutation, colissions)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        (isPermutation, colissions) = validate(path)
+        if isPermutation and colissions == 0:
+            print(f"{path}: solucion valida")
+        elif not isPermutation:
+            print(f"{path}: no es una permutacion (hay columnas repetidas o fuera de rango)")
+        else:
+            print(f"{path}: {colissions} colisiones")
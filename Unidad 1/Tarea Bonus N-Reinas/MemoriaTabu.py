@@ -0,0 +1,48 @@
+import random
+
+# Clase que guarda la memoria tabu de la busqueda como la iteracion en
+#   la que expira cada par de reinas, asi revisar si un movimiento es tabu
+#   cuesta O(1) en lugar de recorrer una cola de movimientos.
+class MemoriaTabu:
+
+    # Constructor de la clase MemoriaTabu
+    # Parametros de entrada:
+    # tenure: Numero de iteraciones que un movimiento permanece tabu.
+    #   Puede ser un entero fijo o una tupla (minimo, maximo) para que
+    #   cada movimiento reciba una permanencia aleatoria en ese rango
+    # rng: Generador de numeros aleatorios para la permanencia aleatoria
+    # Atributos:
+    # expiry: Diccionario par de reinas -> ultima iteracion en la que es tabu
+    def __init__(self, tenure, rng=random):
+        if isinstance(tenure, int):
+            tenure = (tenure, tenure)
+
+        self.minTenure = tenure[0]
+        self.maxTenure = tenure[1]
+        self.rng = rng
+        self.expiry = {}
+
+    # Metodo que indica si un movimiento sigue siendo tabu en la iteracion it
+    def isTabu(self, mov, it):
+        return self.expiry.get(mov, -1) >= it
+
+    # Metodo que registra un movimiento hecho en la iteracion it
+    # Funcionamiento del metodo:
+    # El movimiento sera tabu durante las siguientes "tenure" iteraciones.
+    #   Cada tanto se eliminan los movimientos ya expirados para que el
+    #   diccionario no crezca con el numero de iteraciones.
+    def add(self, mov, it):
+        if self.minTenure == self.maxTenure:
+            tenure = self.minTenure
+        else:
+            tenure = self.rng.randint(self.minTenure, self.maxTenure)
+
+        self.expiry[mov] = it + tenure
+
+        if len(self.expiry) > 2 * self.maxTenure + 16:
+            self.expiry = {m: e for m, e in self.expiry.items() if e >= it}
+
+    # Metodo que regresa el maximo de movimientos que pueden ser tabu al
+    #   mismo tiempo (uno por iteracion durante la permanencia maxima)
+    def maxActive(self):
+        return self.maxTenure
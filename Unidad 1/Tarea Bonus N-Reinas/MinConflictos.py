@@ -0,0 +1,149 @@
+import random
+from array import array
+from Colisiones import Colisiones
+
+# Solucionador de min-conflictos para tableros muy grandes (N = 10^6).
+# Usa la misma representacion de permutacion que N-Reinas.py y los
+#   contadores de diagonales de la clase Colisiones, guardados como
+#   arreglos compactos array('i') (4 bytes por casilla), por lo que un
+#   tablero de un millon de reinas ocupa solo unas decenas de MB.
+
+# Regresa True si la reina del renglon i comparte alguna diagonal
+def isAttacked(engine, i):
+    N = engine.N
+    x = i + 1
+    y = engine.chess[i]
+    return engine.diags[x + y] > 1 or engine.diags2[x - y + N] > 1
+
+# Genera una permutacion inicial con muy pocas colisiones
+# Parametros de entrada:
+# N: Tamaño del tablero
+# rng: Generador de numeros aleatorios
+# freeTail: Numero de reinas finales que se colocan al azar
+# Retorna:
+# chess: Arreglo array('i') con la permutacion
+# Funcionamiento del metodo:
+# Renglon por renglon se prueba intercambiar con una columna aleatoria
+#   de las que faltan por colocar hasta encontrar una cuyas diagonales
+#   esten libres. Las ultimas freeTail reinas (donde casi no quedan
+#   casillas libres) se colocan al azar y se arreglan despues con los
+#   movimientos de min-conflictos.
+def greedyInitialSolution(N, rng, freeTail=None):
+    if freeTail is None:
+        freeTail = min(N, 100)
+
+    chess = array('i', range(1, N + 1))
+    diags = array('i', bytes(4 * (2 * N + 1)))
+    diags2 = array('i', bytes(4 * (2 * N)))
+    randrange = rng.randrange
+    maxAttempts = 3 * N
+
+    for i in range(N):
+        x = i + 1
+        j = randrange(i, N)
+
+        if i < N - freeTail:
+            attempts = 0
+            while attempts < maxAttempts:
+                y = chess[j]
+                if diags[x + y] == 0 and diags2[x - y + N] == 0:
+                    break
+                j = randrange(i, N)
+                attempts += 1
+
+        chess[i], chess[j] = chess[j], chess[i]
+        y = chess[i]
+        diags[x + y] += 1
+        diags2[x - y + N] += 1
+
+    return chess
+
+# Lista de renglones cuyas reinas estan siendo atacadas
+def conflictedQueens(engine):
+    return [i for i in range(engine.N) if isAttacked(engine, i)]
+
+# Busqueda de min-conflictos con indice de reinas en conflicto
+# Parametros de entrada:
+# N: Tamaño del tablero
+# seed: Semilla de la busqueda
+# maxSteps: Maximo de swaps a intentar antes de rendirse
+# Retorna:
+# (chess, steps): chess es el tablero final (array('i')) y steps el
+#   registro de colisiones despues de cada movimiento aceptado
+# Funcionamiento del metodo:
+# Se guarda la lista de reinas atacadas y solo se eligen movimientos
+#   desde ella: se toma una reina atacada al azar, se prueba un swap con
+#   otra reina aleatoria y se acepta si reduce las colisiones (O(1) con
+#   swapDelta). Las reinas que dejan de estar atacadas se sacan de la
+#   lista al momento de elegirlas; si la lista se vacia y aun hay
+#   colisiones, se reconstruye recorriendo el tablero.
+# Si pasan stallLimit intentos sin mejora (minimo local, comun en
+#   tableros chicos) se reinicia desde una nueva solucion inicial.
+# stats es un diccionario opcional donde se guarda el numero de swaps
+#   evaluados ("evaluations")
+def minConflicts(N, seed=None, maxSteps=None, stallLimit=None, stats=None):
+    rng = random.Random(seed)
+    randrange = rng.randrange
+
+    if maxSteps is None:
+        maxSteps = 100 * N + 100000
+    if stallLimit is None:
+        stallLimit = 2 * N + 100
+
+    engine = Colisiones(greedyInitialSolution(N, rng), N)
+    steps = [engine.colissions]
+
+    conflicted = conflictedQueens(engine)
+    tried = 0
+    stall = 0
+
+    while engine.colissions > 0 and tried < maxSteps:
+        if not conflicted:
+            conflicted = conflictedQueens(engine)
+
+        # Tomamos una reina atacada, si ya no lo esta la quitamos
+        # de la lista (cambiandola por la ultima para que sea O(1))
+        k = randrange(len(conflicted))
+        i = conflicted[k]
+        if not isAttacked(engine, i):
+            conflicted[k] = conflicted[-1]
+            conflicted.pop()
+            continue
+
+        tried += 1
+        stall += 1
+        if stall > stallLimit:
+            engine = Colisiones(greedyInitialSolution(N, rng), N)
+            steps.append(engine.colissions)
+            conflicted = conflictedQueens(engine)
+            stall = 0
+            continue
+
+        j = randrange(N)
+        if j == i:
+            continue
+
+        delta = engine.swapDelta(i, j)
+        if delta < 0:
+            engine.applySwap(i, j, delta)
+            steps.append(engine.colissions)
+            stall = 0
+            if isAttacked(engine, j):
+                conflicted.append(j)
+
+    if stats is not None:
+        stats["evaluations"] = tried
+
+    return (engine.chess, steps)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    start = time.time()
+    (chess, steps) = minConflicts(N)
+    print(f"N = {N}, colisiones = {steps[-1]}, movimientos = {len(steps) - 1}, "
+          f"tiempo = {time.time() - start:.2f} s")
@@ -0,0 +1,37 @@
+import importlib.util
+import os
+import sys
+
+# Procesos del pool de multiStartTabu (N-Reinas.py).
+# Viven en su propio modulo porque N-Reinas.py tiene guion en el nombre y
+#   no se puede importar: con el metodo de arranque "spawn" (Windows y
+#   macOS) cada proceso del pool importa de nuevo el modulo de la funcion
+#   que ejecuta, y eso solo funciona si el modulo es importable.
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Evento compartido por los procesos de multiStartTabu, se recibe
+# al crear cada proceso del pool
+stopWorkers = None
+
+def initWorker(stopEvent):
+    global stopWorkers
+    stopWorkers = stopEvent
+
+# Carga N-Reinas.py como modulo (una sola vez por proceso). Tambien la
+#   usa Benchmark.py
+def loadNReinas():
+    if "NReinas" in sys.modules:
+        return sys.modules["NReinas"]
+
+    spec = importlib.util.spec_from_file_location("NReinas", os.path.join(DIRECTORY, "N-Reinas.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["NReinas"] = module
+    spec.loader.exec_module(module)
+    return module
+
+# Busqueda que corre cada proceso del pool, regresa el numero de inicio
+# junto con la mejor solucion y sus pasos
+def tabuWorker(N, start, seed, neighborhood, sampleSize):
+    (chess, steps) = loadNReinas().tabu(N, neighborhood, sampleSize, seed=seed, stop=stopWorkers)
+    return (start, chess, steps)
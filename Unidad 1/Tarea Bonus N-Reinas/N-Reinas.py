@@ -1,12 +1,18 @@
 import random
-from collections import deque
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Colisiones import Colisiones, np
+from MemoriaTabu import MemoriaTabu
+import Formato
+import MultiInicio
 
 # Crear un arreglo con los numeros de 1 a N
 # y luego revolverlo aleatorimente. Representara
 # la primera solución de las N reinas
-def generateRandomSolution(N):
+# rng permite usar un generador con semilla propia
+def generateRandomSolution(N, rng=random):
     chess = list(range(1, N + 1))
-    random.shuffle(chess)
+    rng.shuffle(chess)
     return chess
 
 # Dado una solucion inicial y las posciones para 
@@ -40,14 +46,122 @@ def targetFunction(chess, N):
 
     return colissions
 
-def tabu(N):
-    # Generamos una primera solucion aleatoria
-    chess = generateRandomSolution(N)
+# Busca el mejor movimiento no tabu entre los swaps adyacentes
+# (i, (i + 1) % N), evaluando cada vecino en O(1) sin construirlo
+# Un movimiento tabu se acepta (aspiracion) si deja al tablero con
+# menos colisiones que aspirationLevel
+# Regresa (i, j, delta, mov) o None si todos los swaps son tabu
+def bestAdjacentMove(engine, tabuMemory, it, aspirationLevel):
+    N = engine.N
+    chess = engine.chess
+    best = None
+    bestDelta = N * N
+
+    for i in range(N):
+        j = (i + 1) % N
+
+        # Si el movimiento esta dentro del tabu y no cumple la
+        # aspiracion, entonces ignoramos este vecino
+        mov = (chess[i], chess[j])
+        if mov[0] > mov[1]:
+            mov = (mov[1], mov[0])
+
+        delta = engine.swapDelta(i, j)
+
+        if tabuMemory.isTabu(mov, it) and engine.colissions + delta >= aspirationLevel:
+            continue
+
+        # Si el vecino tiene 0 colisiones ya no hay nada mejor
+        if engine.colissions + delta == 0:
+            return (i, j, delta, mov)
+        # Si resulta ser un mejor vecino que los antes procesados
+        # lo tomamos
+        elif delta < bestDelta:
+            best = (i, j, delta, mov)
+            bestDelta = delta
+
+    return best
+
+# Busca el mejor movimiento no tabu dentro de un bloque de swaps
+# evaluado de forma vectorizada sobre los contadores de diagonales
+# (con la misma regla de aspiracion que bestAdjacentMove)
+# Regresa (i, j, delta, mov) o None si todos los swaps son tabu
+def bestBatchMove(engine, I, J, tabuMemory, it, aspirationLevel):
+    deltas = engine.swapDeltas(I, J)
+
+    # Solo puede haber tantos swaps tabu como movimientos activos en la
+    # memoria, asi que normalmente basta con ordenar los maxActive() + 1
+    # mejores. En una muestra aleatoria un mismo swap puede salir repetido
+    # ((i, j) y (j, i)) y esos k mejores pueden ser todos copias de swaps
+    # tabu; solo en ese caso se ordena el bloque completo
+    k = min(tabuMemory.maxActive() + 1, len(deltas))
+    candidates = np.argpartition(deltas, k - 1)[:k]
+    candidates = candidates[np.argsort(deltas[candidates], kind="stable")]
+
+    move = firstAdmissibleMove(engine, I, J, deltas, candidates, tabuMemory, it, aspirationLevel)
+    if move is None and k < len(deltas):
+        candidates = np.argsort(deltas, kind="stable")
+        move = firstAdmissibleMove(engine, I, J, deltas, candidates, tabuMemory, it, aspirationLevel)
+
+    return move
+
+# Recorre los swaps del bloque en el orden de candidates y regresa el
+# primero que no sea tabu (o que cumpla la aspiracion), o None
+def firstAdmissibleMove(engine, I, J, deltas, candidates, tabuMemory, it, aspirationLevel):
+    chess = engine.chess
+    for c in candidates:
+        i = int(I[c])
+        j = int(J[c])
+        mov = (chess[i], chess[j])
+        if mov[0] > mov[1]:
+            mov = (mov[1], mov[0])
+
+        delta = int(deltas[c])
+        if tabuMemory.isTabu(mov, it) and engine.colissions + delta >= aspirationLevel:
+            continue
+
+        return (i, j, delta, mov)
+
+    return None
+
+# Genera el bloque de swaps a evaluar en el vecindario completo
+# Si sampleSize es None (o mayor al numero de pares) se regresan
+# todos los pares i < j, si no, una muestra aleatoria de pares
+def swapBlock(N, sampleSize, allPairs, npRng):
+    if allPairs is not None:
+        return allPairs
+
+    I = npRng.integers(0, N, sampleSize)
+    J = (I + npRng.integers(1, N, sampleSize)) % N
+    return (I, J)
+
+# neighborhood puede ser "adjacent" (swaps (i, i + 1) evaluados uno a uno)
+# o "full" (todos los pares, o una muestra de sampleSize pares, evaluados
+# en bloque con NumPy)
+# seed fija la semilla de la busqueda para poder repetirla
+# stop es un evento opcional que, al activarse, detiene la busqueda
+# y regresa la mejor solucion encontrada hasta ese momento
+# tenure es el numero de iteraciones que un movimiento es tabu, puede ser
+# un entero o una tupla (minimo, maximo) para una permanencia aleatoria
+# (por defecto N // 2 + 1)
+# aspiration permite tomar movimientos tabu que mejoren bestSolve
+# stats es un diccionario opcional donde se acumula el numero de
+# vecinos evaluados ("evaluations"), usado por Benchmark.py
+def tabu(N, neighborhood="adjacent", sampleSize=None, seed=None, stop=None,
+         tenure=None, aspiration=True, stats=None):
+    rng = random.Random(seed)
+    if stats is None:
+        stats = {}
+    stats["evaluations"] = 0
+
+    # Generamos una primera solucion aleatoria y el motor de colisiones
+    # que mantiene los contadores de diagonales entre iteraciones
+    engine = Colisiones(generateRandomSolution(N, rng), N)
 
     # bestChess guardara la mejor solucion global encontrada
     # bestSolve guardara el numero de colisiones de bestChess
-    bestSolve = targetFunction(chess, N)
-    bestChess = chess
+    bestSolve = engine.colissions
+    bestChess = engine.board()
 
     # steps llevara el registro de colisiones de los mejores vecinos
     # por default agregamos el numero de colisiones del estado inicial
@@ -56,72 +170,80 @@ def tabu(N):
     # Si da la casualidad de que la solucion inicial es la mejor
     # la retornamos
     if bestSolve == 0:
-        return (chess, steps)
+        return (bestChess, steps)
 
-    # Creamos una lista donde estaran los movimientos
-    # tabu y establecemos el maximo
-    maxTabu = (N // 2) + 1
-    tabuMovs = deque()
+    # Creamos la memoria donde estaran los movimientos tabu con
+    # la iteracion en la que expiran
+    if tenure is None:
+        tenure = (N // 2) + 1
+    tabuMemory = MemoriaTabu(tenure, rng)
+    it = 0
 
     # Definimos un maximo de iteraciones permitidos 
     # sin mejora
     maxTries = 100
     tries = 0
 
+    # En el vecindario completo precalculamos todos los pares si
+    # no se pidio una muestra
+    allPairs = None
+    npRng = None
+    if neighborhood == "full":
+        if np is None:
+            raise ImportError("El vecindario completo necesita numpy")
+        npRng = np.random.default_rng(rng.getrandbits(64))
+        if sampleSize is None or sampleSize >= N * (N - 1) // 2:
+            allPairs = np.triu_indices(N, 1)
+
     while tries < maxTries:
+        it += 1
+
+        # Si otra busqueda ya encontro la solucion nos detenemos
+        if stop is not None and stop.is_set():
+            break
+
+        # Con aspiracion un movimiento tabu se acepta si mejora bestSolve
+        aspirationLevel = bestSolve if aspiration else 0
 
-        # bestNeighbor es donde guardaremos el mejor vecino
+        # Obtenemos el mejor movimiento no tabu del vecindario
+        # (i, j) son las posiciones del swap que lleva al mejor vecino
         # bestMov es el movimiento hecho para llegar al mejor vecino
-        # bestColission el numero de colisiones de bestNeighbor
-        bestNeighbor = []
-        bestMov = ()
-        bestColission = N * N
-
-        # Crear y revisar vecindario
-        for i in range(N):
-            j = (i + 1) % N
-
-            # Si el movimiento esta dentro del tabu, entonces
-            # ignoramos este vecino
-            mov = (chess[i], chess[j])
-            if mov[0] > mov[1]:
-                mov = (mov[1], mov[0])
-
-            if mov in tabuMovs:
-                continue
-            
-            # Obtenemos el vecino y sus colisiones
-            neighbor = getNeighbor(chess, i, j)
-            neighborColission = targetFunction(neighbor, N)
-
-            # Si el vecino tiene 0 colisiones se encontro la mejor solución
-            if(neighborColission == 0):
-                steps.append(0)
-                return (neighbor, steps)
-            # Si resulta ser un mejor vecino que los antes procesados
-            # lo tomamos
-            elif neighborColission < bestColission:
-                bestNeighbor = neighbor
-                bestColission = neighborColission
-                bestMov = mov
+        # bestDelta el cambio de colisiones de ese vecino
+        if neighborhood == "full":
+            (I, J) = swapBlock(N, sampleSize, allPairs, npRng)
+            move = bestBatchMove(engine, I, J, tabuMemory, it, aspirationLevel)
+            stats["evaluations"] += len(I)
+        else:
+            move = bestAdjacentMove(engine, tabuMemory, it, aspirationLevel)
+            stats["evaluations"] += N
+
+        # Si todos los vecinos son tabu no hay movimiento posible
+        if move is None:
+            break
+
+        # Movemos el tablero al mejor vecino
+        (i, j, bestDelta, bestMov) = move
+        engine.applySwap(i, j, bestDelta)
+        bestColission = engine.colissions
+
+        # Si el vecino tiene 0 colisiones se encontro la mejor solución
+        if bestColission == 0:
+            steps.append(0)
+            return (engine.board(), steps)
 
         #Checamos si es la mejor solucion global
         if bestColission < bestSolve:
             bestSolve = bestColission
-            bestChess = bestNeighbor
+            bestChess = engine.board()
             tries = 0
         else:
             tries += 1
         
-        # Guardamos el movimiento usado en los tabus
-        # Si la cola excedio el maximo, sacamos el primero
-        tabuMovs.append(bestMov)
-        if len(tabuMovs) > maxTabu:
-            tabuMovs.popleft()
+        # Guardamos el movimiento usado en los tabus, sera tabu
+        # durante las siguientes "tenure" iteraciones
+        tabuMemory.add(bestMov, it)
         
-        # Actualizamos chess para que sea el mejor vecino
-        # y agregamos este nuevo paso al registro
-        chess = bestNeighbor
+        # Agregamos este nuevo paso al registro
         steps.append(bestColission)
         
     # Si excedemos el maximo de iteraciones
@@ -129,6 +251,53 @@ def tabu(N):
     return (bestChess, steps) 
 
 
+# Corre K busquedas tabu independientes (una por semilla) en un pool
+# de procesos. En cuanto una llega a 0 colisiones se avisa a las demas
+# para que se detengan y se cancelan las que no han empezado.
+# Los procesos ejecutan MultiInicio.tabuWorker, asi el pool funciona
+# tambien con el metodo de arranque "spawn".
+# Regresa (bestChess, bestSeed, traces), donde traces es un diccionario
+# numero de inicio (0..K - 1) -> steps con el registro de cada busqueda
+# que corrio (si se repite una semilla cada inicio conserva su registro)
+def multiStartTabu(N, K, seeds=None, workers=None, neighborhood="adjacent", sampleSize=None):
+    if seeds is None:
+        seeds = list(range(K))
+
+    context = multiprocessing.get_context()
+    stop = context.Event()
+
+    bestChess = None
+    bestSeed = None
+    bestSolve = None
+    traces = {}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=MultiInicio.initWorker, initargs=(stop,)) as pool:
+        futures = [pool.submit(MultiInicio.tabuWorker, N, start, seed, neighborhood, sampleSize)
+                   for (start, seed) in enumerate(seeds)]
+
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+
+            (start, chess, steps) = future.result()
+            traces[start] = steps
+
+            # La mejor solucion de cada busqueda tiene min(steps) colisiones
+            if bestSolve is None or min(steps) < bestSolve:
+                bestSolve = min(steps)
+                bestChess = chess
+                bestSeed = seeds[start]
+
+            # Primera solucion encontrada: detenemos al resto
+            if bestSolve == 0 and not stop.is_set():
+                stop.set()
+                for pending in futures:
+                    pending.cancel()
+
+    return (bestChess, bestSeed, traces)
+
+
 # Imprimir el estado en formato tablero
 def printChessBoard(chess, N):
     for i in range(N):
@@ -137,6 +306,10 @@ def printChessBoard(chess, N):
         print(row)
 
 
+# Tamaño maximo de tablero que se imprime completo, para tableros
+# mas grandes la solucion y los pasos se guardan en formato binario
+MAX_PRINT = 100
+
 def main():
     # Preguntar por el tamaño del tablero
     N = int(input("Inserte el tamaño del tablero: "))
@@ -146,6 +319,18 @@ def main():
     (chessSolve, steps) = tabu(N)
     colissions = targetFunction(chessSolve, N)
 
+    if N > MAX_PRINT:
+        Formato.saveSolution(f"solucion_{N}.bin", chessSolve)
+        Formato.saveSteps(f"pasos_{N}.bin", steps)
+
+        if colissions == 0:
+            print(f"Se encontro la solución, guardada en solucion_{N}.bin")
+        else:
+            print(f"La mejor solucion encontrada fue de {colissions} colisiones, guardada en solucion_{N}.bin")
+
+        print(f"Numero de pasos para llegar a la solucion: {len(steps)} (guardados en pasos_{N}.bin)")
+        return
+
     if colissions == 0:
         print(f"Se encontro la solución: {chessSolve}")
     else:
@@ -157,4 +342,5 @@ def main():
     print(f"Numero de pasos para llegar a la solucion: {len(steps)}")
     print(f"Pasos: {steps}")
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import math
+import random
+import time
+import numpy as np
+import Sistema_Enrutamiento
+from Sistema_Enrutamiento import read_distances, read_store_data, route_cost
+
+# Busqueda adaptativa de vecindario grande (ALNS) para el mismo problema
+#   y la misma representacion de rutas que la busqueda tabu de
+#   Sistema_Enrutamiento.py (cada ruta es [centro, tiendas...]).
+# En cada iteracion un operador de destruccion quita varias tiendas de la
+#   solucion y un operador de reparacion las vuelve a insertar:
+# Destruccion: "random" (tiendas al azar), "worst" (las que mas cuestan
+#   en su posicion actual) y "related" (una tienda y las mas cercanas a ella)
+# Reparacion: "greedy" (siempre la insercion mas barata) y "regret-k"
+#   (primero la tienda que mas perderia si no se inserta en su mejor ruta)
+# Los operadores se eligen por ruleta con pesos que se adaptan segun que
+#   tan buenas soluciones producen, y la nueva solucion se acepta con el
+#   criterio de recocido simulado. Al cambiar muchas tiendas por iteracion
+#   avanza mucho mas rapido que mover una tienda a la vez en redes grandes.
+
+DESTROY = ["random", "worst", "related"]
+REPAIR = ["greedy", "regret-2", "regret-3"]
+
+# Puntos que recibe un operador segun el resultado de la iteracion
+SCORE_BEST = 33
+SCORE_BETTER = 9
+SCORE_ACCEPTED = 13
+
+# Elegimos un indice de 0 a n - 1 favoreciendo los primeros: u^p * n con
+# u aleatorio, p (determinism) mas grande es mas determinista
+def biased_index(n, determinism):
+    return int(random.random() ** determinism * n)
+
+# Operadores de destruccion. Reciben las rutas y el numero de tiendas a
+# quitar y regresan la lista de tiendas a quitar
+def destroy_random(routes, distances, count, determinism):
+    stores = [node for route in routes for node in route[1:]]
+    return random.sample(stores, count)
+
+def destroy_worst(routes, distances, count, determinism):
+    arrays = Sistema_Enrutamiento.relocation_arrays(routes)
+    store = arrays["store_node"]
+    a = arrays["store_prev"]
+    c = arrays["store_next"]
+
+    # Lo que se ahorra al quitar cada tienda de su posicion
+    saving = np.asarray(distances[a, store] + distances[store, c] - distances[a, c], dtype=np.float64)
+    order = np.argsort(-saving, kind="stable").tolist()
+
+    removed = []
+    while len(removed) < count:
+        removed.append(int(store[order.pop(biased_index(len(order), determinism))]))
+    return removed
+
+def destroy_related(routes, distances, count, determinism):
+    stores = np.array([node for route in routes for node in route[1:]], dtype=np.int64)
+    seed = int(stores[random.randrange(len(stores))])
+
+    # Las tiendas mas relacionadas son las mas cercanas a la semilla
+    dist = np.asarray(distances[seed, stores], dtype=np.float64)
+    order = np.argsort(dist, kind="stable").tolist()
+    order.remove(int(np.flatnonzero(stores == seed)[0]))
+
+    removed = [seed]
+    while len(removed) < count:
+        removed.append(int(stores[order.pop(biased_index(len(order), determinism))]))
+    return removed
+
+DESTROY_OPERATORS = {
+    "random": destroy_random,
+    "worst": destroy_worst,
+    "related": destroy_related,
+}
+
+# Mejor insercion de cada tienda en una ruta
+# Regresa (costos, posiciones): el costo de insertar cada tienda en su
+# mejor arista de la ruta y la posicion despues de la cual se inserta
+def route_insertions(stores, route, distances):
+    a = np.asarray(route, dtype=np.int64)
+    b = np.roll(a, -1)
+    insertion = distances[a[None, :], stores[:, None]] + distances[stores[:, None], b[None, :]] - \
+                distances[a, b][None, :]
+    insertion = np.asarray(insertion, dtype=np.float64)
+
+    pos = np.argmin(insertion, axis=1)
+    return (insertion[np.arange(len(stores)), pos], pos)
+
+# Reparacion: inserta las tiendas quitadas una por una
+# regret: 1 para la reparacion voraz (se inserta la tienda con la insercion
+#   mas barata), k >= 2 para regret-k (se inserta la tienda con mayor
+#   diferencia entre su mejor ruta y sus k - 1 siguientes)
+# Funcionamiento:
+# Se guarda una matriz tiendas x rutas con la mejor insercion de cada
+#   tienda en cada ruta; al insertar una tienda solo cambia la columna de
+#   esa ruta, asi que solo esa se vuelve a calcular.
+def repair(routes, removed, distances, regret=1):
+    stores = np.asarray(removed, dtype=np.int64)
+    costs = np.empty((len(stores), len(routes)))
+    positions = np.empty((len(stores), len(routes)), dtype=np.int64)
+    for (r, route) in enumerate(routes):
+        (costs[:, r], positions[:, r]) = route_insertions(stores, route, distances)
+
+    pending = np.ones(len(stores), dtype=bool)
+    for _ in range(len(stores)):
+        candidates = np.flatnonzero(pending)
+        rows = costs[candidates]
+        best_route = np.argmin(rows, axis=1)
+        best_cost = rows[np.arange(len(candidates)), best_route]
+
+        if regret > 1 and len(routes) > 1:
+            k = min(regret, len(routes))
+            ordered = np.partition(rows, k - 1, axis=1)[:, :k]
+            ordered.sort(axis=1)
+            value = (ordered[:, 1:] - ordered[:, :1]).sum(axis=1)
+            # Mayor arrepentimiento, y en empate la insercion mas barata
+            choice = np.lexsort((best_cost, -value))[0]
+        else:
+            choice = int(np.argmin(best_cost))
+
+        i = candidates[choice]
+        r = int(best_route[choice])
+        routes[r].insert(int(positions[i, r]) + 1, int(stores[i]))
+        pending[i] = False
+
+        remaining = np.flatnonzero(pending)
+        if len(remaining) > 0:
+            (costs[remaining, r], positions[remaining, r]) = route_insertions(stores[remaining], routes[r], distances)
+
+    return routes
+
+# Operadores de reparacion por nombre ("regret-k" usa k rutas)
+def repair_operator(name):
+    if name == "greedy":
+        return lambda routes, removed, distances: repair(routes, removed, distances, 1)
+    if name.startswith("regret-"):
+        k = int(name.split("-")[1])
+        return lambda routes, removed, distances: repair(routes, removed, distances, k)
+    raise ValueError(f"Operador de reparacion desconocido: {name}")
+
+# Elegimos un operador por ruleta con sus pesos
+def roulette(weights):
+    pick = random.random() * sum(weights)
+    for (i, weight) in enumerate(weights):
+        pick -= weight
+        if pick <= 0:
+            return i
+    return len(weights) - 1
+
+# Busqueda ALNS
+# Parametros de entrada:
+# centers, stores, distances: mismo problema que solve
+# max_time: tiempo maximo de busqueda en segundos
+# target_cost: si se alcanza un costo menor o igual se detiene la busqueda
+# removal: fraccion (minima, maxima) de tiendas que se quitan por iteracion
+#   (al menos una tienda, a lo mas max_removal)
+# destroy, repair_ops: nombres de los operadores a usar
+# segment: iteraciones entre cada ajuste de los pesos
+# reaction: que tanto cambian los pesos con los puntos del ultimo segmento
+# start_worse: al inicio se acepta con probabilidad 1/2 una solucion este
+#   porcentaje peor; la temperatura baja con el tiempo hasta final_worse
+# determinism: sesgo de los operadores "worst" y "related"
+# initial_routes: rutas para empezar (por defecto generate_initial_solve)
+# stats: diccionario opcional donde se guardan las iteraciones, las mejoras
+#   como (segundos, costo) y los pesos finales de los operadores
+# Retorna:
+# (best_routes, best_cost, steps) como solve
+def alns_solve(centers, stores, distances, max_time=10.0, target_cost=None, removal=(0.05, 0.2),
+               max_removal=100, destroy=DESTROY, repair_ops=REPAIR, segment=100, reaction=0.1,
+               start_worse=0.05, final_worse=0.0005, determinism=4, initial_routes=None, stats=None):
+    if initial_routes is not None:
+        act_routes = Sistema_Enrutamiento.repair_routes(initial_routes, centers, stores, distances)
+    else:
+        act_routes = Sistema_Enrutamiento.generate_initial_solve(centers, stores, distances)
+    act_costs = [route_cost(route, distances) for route in act_routes]
+    act_cost = sum(act_costs)
+
+    best_routes = [row[:] for row in act_routes]
+    best_cost = act_cost
+    steps = [act_cost]
+
+    if stats is None:
+        stats = {}
+    stats["improvements"] = [(0.0, best_cost)]
+
+    destroy_ops = [DESTROY_OPERATORS[name] for name in destroy]
+    repair_funcs = [repair_operator(name) for name in repair_ops]
+    destroy_weights = [1.0] * len(destroy_ops)
+    repair_weights = [1.0] * len(repair_funcs)
+    destroy_scores = [0.0] * len(destroy_ops)
+    repair_scores = [0.0] * len(repair_funcs)
+    destroy_uses = [0] * len(destroy_ops)
+    repair_uses = [0] * len(repair_funcs)
+
+    min_removal = max(1, min(stores, int(removal[0] * stores)))
+    top_removal = max(min_removal, min(stores, max_removal, int(removal[1] * stores)))
+
+    # Temperaturas del recocido: con T = -w * costo / ln(1 / 2) una solucion
+    # un w por uno peor se acepta la mitad de las veces
+    start_temperature = start_worse * act_cost / math.log(2)
+    final_temperature = final_worse * act_cost / math.log(2)
+
+    start_time = time.time()
+    iteration = 0
+
+    while time.time() - start_time < max_time:
+        if target_cost is not None and best_cost <= target_cost:
+            break
+        if stores == 0:
+            break
+
+        iteration += 1
+        d = roulette(destroy_weights)
+        r = roulette(repair_weights)
+
+        # Destruimos y reparamos una copia de la solucion actual
+        count = random.randint(min_removal, top_removal)
+        removed = destroy_ops[d](act_routes, distances, count, determinism)
+        removed_set = set(removed)
+
+        new_routes = [[node for node in route if node not in removed_set] for route in act_routes]
+        repair_funcs[r](new_routes, removed, distances)
+
+        # Solo recalculamos el costo de las rutas que cambiaron
+        new_costs = act_costs[:]
+        for (i, route) in enumerate(new_routes):
+            if route != act_routes[i]:
+                new_costs[i] = route_cost(route, distances)
+        new_cost = sum(new_costs)
+
+        # Criterio de recocido simulado con temperatura que baja con el tiempo
+        progress = min(1.0, (time.time() - start_time) / max_time) if max_time > 0 else 1.0
+        temperature = start_temperature * (final_temperature / start_temperature) ** progress \
+            if start_temperature > 0 else 0.0
+
+        score = 0
+        if new_cost < best_cost:
+            score = SCORE_BEST
+        elif new_cost < act_cost:
+            score = SCORE_BETTER
+        elif temperature > 0 and random.random() < math.exp((act_cost - new_cost) / temperature):
+            score = SCORE_ACCEPTED
+
+        if score > 0:
+            act_routes = new_routes
+            act_costs = new_costs
+            act_cost = new_cost
+
+        if act_cost < best_cost:
+            best_cost = act_cost
+            best_routes = [row[:] for row in act_routes]
+            stats["improvements"].append((time.time() - start_time, best_cost))
+
+        destroy_scores[d] += score
+        repair_scores[r] += score
+        destroy_uses[d] += 1
+        repair_uses[r] += 1
+
+        # Ajuste de pesos al final de cada segmento
+        if iteration % segment == 0:
+            for (weights, scores, uses) in ((destroy_weights, destroy_scores, destroy_uses),
+                                            (repair_weights, repair_scores, repair_uses)):
+                for i in range(len(weights)):
+                    if uses[i] > 0:
+                        weights[i] = (1 - reaction) * weights[i] + reaction * scores[i] / uses[i]
+                    weights[i] = max(weights[i], 0.01)
+                    scores[i] = 0.0
+                    uses[i] = 0
+
+        steps.append(act_cost)
+
+    stats["iterations"] = iteration
+    stats["destroy_weights"] = dict(zip(destroy, destroy_weights))
+    stats["repair_weights"] = dict(zip(repair_ops, repair_weights))
+
+    return (best_routes, best_cost, steps)
+
+def main():
+    distances = read_distances()
+    centers, stores = read_store_data()
+
+    (routes, cost, steps) = alns_solve(len(centers), len(stores), distances)
+
+    # Imprimir resultados
+    print("Mejor ruta encontrada: ")
+    print(routes)
+    print("Costo de la ruta: " + str(float(cost)))
+
+    # Imprimir resultados de primeras 10 iteraciones
+    # y de ultimas 10 iteraciones
+    print([float(c) for c in steps[:10]])
+    print([float(c) for c in steps[-10:]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import GeneradorInstancias
+import Sistema_Enrutamiento
+
+# Banco de pruebas del solucionador de rutas.
+# Para cada tamaño de red se genera una instancia sintetica
+#   (GeneradorInstancias.py) y se corre solve con un tiempo fijo una vez
+#   por semilla de la busqueda. Se miden las iteraciones por segundo, el
+#   tiempo para llegar a distintos umbrales de costo, el costo final y la
+#   memoria pico. Los resultados se guardan en CSV y JSON para comparar el
+#   ciclo de busqueda entre versiones.
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Umbrales de costo: porcentaje sobre el mejor costo conocido de cada
+#   instancia (el menor que se encontro entre todas sus corridas)
+THRESHOLDS = [0.10, 0.05, 0.01]
+
+# Carpeta de una instancia generada
+def instance_directory(instances_dir, nodes, seed):
+    return os.path.join(instances_dir, f"n{nodes}_s{seed}")
+
+# Genera la instancia (si no existe) y su cache binaria de distancias,
+#   para que ninguna de las dos cuente en el tiempo ni en la memoria de
+#   las corridas
+def prepare_instance(instances_dir, nodes, seed):
+    directory = instance_directory(instances_dir, nodes, seed)
+    distances_path = os.path.join(directory, "distance_matrix.csv")
+    if not os.path.exists(distances_path):
+        GeneradorInstancias.generate_instance(nodes, seed=seed, directory=directory)
+
+    Sistema_Enrutamiento.read_distances(distances_path)
+    return directory
+
+# Corre un caso del banco de pruebas y regresa sus metricas
+# Se ejecuta en un proceso nuevo por caso para que la memoria pico
+#   (ru_maxrss) corresponda solo a ese caso
+def run_case(directory, nodes, seed, max_time, solve_args):
+    distances = Sistema_Enrutamiento.read_distances(os.path.join(directory, "distance_matrix.csv"))
+    (centers, stores) = Sistema_Enrutamiento.read_store_data(os.path.join(directory, "store_distribution_data.csv"))
+
+    random.seed(seed)
+    stats = {}
+    start = time.perf_counter()
+    (routes, cost, steps) = Sistema_Enrutamiento.solve(len(centers), len(stores), distances, max_time,
+                                                       stats=stats, **solve_args)
+    wall_time = time.perf_counter() - start
+
+    # El costo final se recalcula en lugar de confiar en el libro de costos
+    final_cost = float(Sistema_Enrutamiento.calculate_cost(routes, len(centers), distances))
+    is_complete = sorted(Sistema_Enrutamiento.encode_routes(routes)) == list(range(nodes))
+
+    peak_memory = None
+    if resource is not None:
+        # ru_maxrss esta en KB en Linux y en bytes en macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_memory = maxrss / 1024 if sys.platform != "darwin" else maxrss / (1024 * 1024)
+
+    return {
+        "nodes": nodes,
+        "seed": seed,
+        "wall_time": wall_time,
+        "iterations": stats["iterations"],
+        "iterations_per_second": stats["iterations"] / wall_time if wall_time > 0 else None,
+        "initial_cost": float(steps[0]),
+        "final_cost": final_cost,
+        "complete": is_complete,
+        "peak_memory_mb": peak_memory,
+        "improvements": [(float(t), float(c)) for (t, c) in stats["improvements"]],
+    }
+
+# Tiempo en que una corrida llego por primera vez a un costo menor o igual
+# a target (None si no llego)
+def time_to_reach(improvements, target):
+    for (elapsed, cost) in improvements:
+        if cost <= target:
+            return elapsed
+    return None
+
+# Corre el barrido completo de tamaños y semillas
+# Parametros de entrada:
+# sizes: Lista de numeros de nodos
+# seeds: Lista de semillas de la busqueda (todas sobre la misma instancia)
+# max_time: Tiempo de cada corrida en segundos
+# instances_dir: Carpeta donde se guardan las instancias generadas
+# solve_args: Parametros extra para solve
+# instance_seed: Semilla con la que se generan las instancias
+# Retorna:
+# (results, summary): metricas por caso y resumen por tamaño
+def run_benchmark(sizes, seeds, max_time, instances_dir, solve_args=None, instance_seed=0):
+    solve_args = solve_args if solve_args is not None else {}
+    results = []
+
+    for nodes in sizes:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            directory = pool.submit(prepare_instance, instances_dir, nodes, instance_seed).result()
+
+        for seed in seeds:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(run_case, directory, nodes, seed, max_time, solve_args).result()
+            results.append(result)
+            print(f"N={nodes:<6} semilla={seed:<3} iteraciones/s={result['iterations_per_second']:.1f} "
+                  f"costo={result['final_cost']:.2f} memoria={result['peak_memory_mb'] or 0:.1f}MB")
+
+    # Tiempo a cada umbral respecto al mejor costo conocido de la instancia
+    for result in results:
+        best_known = min(r["final_cost"] for r in results if r["nodes"] == result["nodes"])
+        for threshold in THRESHOLDS:
+            result[f"time_to_{threshold:.0%}"] = time_to_reach(result["improvements"], best_known * (1 + threshold))
+
+    summary = []
+    for nodes in sizes:
+        cases = [r for r in results if r["nodes"] == nodes]
+        row = {
+            "nodes": nodes,
+            "runs": len(cases),
+            "mean_iterations_per_second": sum(r["iterations_per_second"] or 0 for r in cases) / len(cases),
+            "mean_final_cost": sum(r["final_cost"] for r in cases) / len(cases),
+            "max_peak_memory_mb": max((r["peak_memory_mb"] or 0) for r in cases),
+        }
+        for threshold in THRESHOLDS:
+            times = [r[f"time_to_{threshold:.0%}"] for r in cases if r[f"time_to_{threshold:.0%}"] is not None]
+            row[f"mean_time_to_{threshold:.0%}"] = sum(times) / len(times) if times else None
+        summary.append(row)
+
+    return (results, summary)
+
+# Guarda los resultados en <prefix>.csv (un renglon por caso, sin el
+#   registro de mejoras) y en <prefix>.json (casos completos y resumen)
+def save_results(prefix, results, summary):
+    fields = [key for key in results[0].keys() if key != "improvements"]
+    with open(prefix + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+    with open(prefix + ".json", "w") as f:
+        json.dump({"results": results, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banco de pruebas del sistema de enrutamiento")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 500, 1000, 5000, 10000])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--time", type=float, default=10.0)
+    parser.add_argument("--granular-k", type=int, default=None)
+    parser.add_argument("--instance-seed", type=int, default=0)
+    parser.add_argument("--instances", default=os.path.join(DIRECTORY, "instancias"))
+    parser.add_argument("--output", default="benchmark")
+    args = parser.parse_args()
+
+    solve_args = {"granular_k": args.granular_k} if args.granular_k is not None else {}
+    (results, summary) = run_benchmark(args.sizes, args.seeds, args.time, args.instances, solve_args,
+                                       args.instance_seed)
+    save_results(args.output, results, summary)
+
+    print()
+    for row in summary:
+        reached = " ".join(f"t({threshold:.0%})=" + ("-" if row[f"mean_time_to_{threshold:.0%}"] is None
+                                                   else f"{row[f'mean_time_to_{threshold:.0%}']:.2f}s")
+                           for threshold in THRESHOLDS)
+        print(f"N={row['nodes']:<6} iteraciones/s={row['mean_iterations_per_second']:.1f} "
+              f"costo={row['mean_final_cost']:.2f} memoria={row['max_peak_memory_mb']:.1f}MB {reached}")
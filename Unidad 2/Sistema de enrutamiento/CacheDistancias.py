@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Cache binaria de la matriz de distancias.
+# La primera lectura del CSV guarda la matriz en un archivo .npy junto con
+#   un archivo .json con la fecha de modificacion, el tamaño y el hash del
+#   CSV. Las siguientes lecturas abren el .npy con np.load(mmap_mode='r'),
+#   sin volver a interpretar el CSV ni crear listas de floats de Python.
+
+# Calcula el hash sha256 de un archivo leyendolo por bloques
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+# Clase que guarda solo el triangulo superior (incluyendo la diagonal) de
+#   una matriz simetrica, la mitad de memoria y disco que la matriz completa.
+# Se puede indexar como la matriz completa:
+# m[i]: renglon i completo (arreglo de NumPy)
+# m[filas]: renglones de un arreglo de indices (matriz de len(filas) x n)
+# m[i, j]: distancia entre i y j (i y j tambien pueden ser arreglos)
+# Consultar un renglon cuesta O(n), por lo que esta pensada para los
+#   calculos vectorizados y no para ciclos de Python elemento por elemento.
+class MatrizCondensada:
+
+    # Constructor de la clase MatrizCondensada
+    # Parametros de entrada:
+    # data: Arreglo con los n * (n + 1) / 2 valores del triangulo superior,
+    #   guardados renglon por renglon
+    # n: Numero de nodos
+    def __init__(self, data, n):
+        self.data = data
+        self.n = n
+        self.shape = (n, n)
+        self.dtype = data.dtype
+
+    # Construye la matriz condensada a partir de una matriz completa
+    @staticmethod
+    def from_full(matrix):
+        n = matrix.shape[0]
+        return MatrizCondensada(np.asarray(matrix)[np.triu_indices(n)], n)
+
+    # Posicion dentro de data del elemento (i, j)
+    def index(self, i, j):
+        i = np.asarray(i, dtype=np.int64)
+        j = np.asarray(j, dtype=np.int64)
+        lo = np.minimum(i, j)
+        hi = np.maximum(i, j)
+        return lo * self.n - lo * (lo - 1) // 2 + (hi - lo)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            (i, j) = key
+            return self.data[self.index(i, j)]
+
+        rows = np.asarray(key, dtype=np.int64)
+        cols = np.arange(self.n, dtype=np.int64)
+        return self.data[self.index(rows[..., None], cols)]
+
+    def __array__(self, dtype=None, copy=None):
+        full = self[np.arange(self.n)]
+        return full if dtype is None else full.astype(dtype)
+
+# Rutas de los archivos de cache de un CSV
+def cache_paths(csv_path, dtype, condensed, cache_dir):
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    layout = "condensed" if condensed else "full"
+    name = f"{base}.{np.dtype(dtype).name}.{layout}"
+    directory = cache_dir if cache_dir is not None else os.path.dirname(os.path.abspath(csv_path))
+    return (os.path.join(directory, name + ".npy"), os.path.join(directory, name + ".json"))
+
+# Revisa si la cache corresponde al CSV actual
+# Si la fecha de modificacion o el tamaño cambiaron se compara el hash
+#   (el archivo pudo copiarse o tocarse sin cambiar su contenido); si el
+#   hash coincide se actualiza la fecha en el .json
+def cache_is_valid(csv_path, npy_path, meta_path):
+    if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+        return False
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    stat = os.stat(csv_path)
+    if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+        return True
+
+    if meta.get("sha256") != file_hash(csv_path):
+        return False
+
+    meta["mtime_ns"] = stat.st_mtime_ns
+    meta["size"] = stat.st_size
+    write_meta(meta_path, meta)
+    return True
+
+def write_meta(meta_path, meta):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+# Lee el CSV y escribe la cache (el .npy se escribe en un archivo temporal
+#   y luego se renombra, para que una lectura a medias nunca quede valida)
+def build_cache(csv_path, npy_path, meta_path, dtype, condensed):
+    distances_df = pd.read_csv(csv_path)
+    matrix = distances_df.to_numpy(dtype=dtype)
+
+    if condensed:
+        if not np.allclose(matrix, matrix.T):
+            raise ValueError(f"{csv_path} no es simetrica, no se puede condensar")
+        data = MatrizCondensada.from_full(matrix).data
+    else:
+        data = matrix
+
+    tmp_path = npy_path + ".tmp.npy"
+    np.save(tmp_path, data)
+    os.replace(tmp_path, npy_path)
+
+    stat = os.stat(csv_path)
+    write_meta(meta_path, {
+        "csv": os.path.basename(csv_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": file_hash(csv_path),
+        "dtype": np.dtype(dtype).name,
+        "layout": "condensed" if condensed else "full",
+        "n": matrix.shape[0],
+        "columns": distances_df.columns.tolist(),
+    })
+
+# Regresa la matriz de distancias de un CSV usando la cache binaria
+# Parametros de entrada:
+# csv_path: Ruta del CSV con la matriz de distancias
+# dtype: Tipo de dato con el que se guarda la matriz (float32 o float64)
+# condensed: Guardar solo el triangulo superior (matrices simetricas)
+# cache_dir: Carpeta para la cache (por defecto la del CSV)
+# Retorna:
+# La matriz como arreglo de NumPy de solo lectura mapeado a memoria, o
+#   una MatrizCondensada si condensed es True
+def load_distances(csv_path, dtype=np.float64, condensed=False, cache_dir=None):
+    (npy_path, meta_path) = cache_paths(csv_path, dtype, condensed, cache_dir)
+
+    if not cache_is_valid(csv_path, npy_path, meta_path):
+        build_cache(csv_path, npy_path, meta_path, dtype, condensed)
+
+    data = np.load(npy_path, mmap_mode='r')
+
+    if condensed:
+        with open(meta_path) as f:
+            n = json.load(f)["n"]
+        return MatrizCondensada(data, n)
+
+    return data
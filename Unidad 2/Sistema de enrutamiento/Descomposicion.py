@@ -0,0 +1,189 @@
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import Sistema_Enrutamiento
+from EvaluacionParalela import share_distances, init_distances_worker, distances_state
+
+# Descomposicion "primero agrupar, despues rutear" para redes grandes.
+# 1. Cada tienda se asigna a su centro de distribucion mas cercano y los
+#   centros se juntan en grupos (clusters) de a lo mas max_size tiendas,
+#   juntando centros cercanos (por la matriz de distancias o, si se dan,
+#   por sus coordenadas).
+# 2. Cada cluster es un subproblema independiente (sus centros, sus
+#   tiendas y su submatriz de distancias) que se resuelve con la busqueda
+#   tabu de Sistema_Enrutamiento.solve, en paralelo en un pool de procesos.
+# 3. Las rutas de todos los clusters se juntan y se hace una reparacion de
+#   fronteras: una busqueda tabu sobre toda la red que arranca desde esa
+#   solucion con vecindarios granulares, por lo que solo mueve tiendas
+#   hacia rutas cercanas, que es donde estan las fronteras entre clusters.
+# Un centro tiene una sola ruta, por lo que un centro con mas de max_size
+#   tiendas cercanas forma un cluster por si solo aunque pase el limite.
+
+# Asignamos cada tienda a su centro mas cercano
+# Regresa (nearest, load): el centro de cada tienda y cuantas tiendas
+#   quedaron en cada centro
+def nearest_centers(centers, stores, distances, block_size=1 << 22):
+    nearest = np.empty(stores, dtype=np.int64)
+    rows = max(1, block_size // max(1, centers))
+    center_ids = np.arange(centers)
+
+    for start in range(0, stores, rows):
+        block = np.arange(centers + start, centers + min(stores, start + rows))
+        dist = np.asarray(distances[block[:, None], center_ids[None, :]], dtype=np.float64)
+        nearest[start:start + len(block)] = np.argmin(dist, axis=1)
+
+    return (nearest, np.bincount(nearest, minlength=centers))
+
+# Agrupamos los centros usando la matriz de distancias: cada grupo empieza
+# con el centro libre con mas tiendas y se le agregan los centros libres
+# mas cercanos mientras no se pase de max_size tiendas
+def group_by_distance(centers, distances, load, max_size):
+    free = set(range(centers))
+    groups = []
+
+    while free:
+        seed = max(free, key=lambda c: load[c])
+        free.remove(seed)
+        group = [seed]
+        size = load[seed]
+
+        others = sorted(free)
+        dist = np.asarray(distances[seed, np.array(others, dtype=np.int64)], dtype=np.float64)
+        for k in np.argsort(dist, kind="stable").tolist():
+            if size + load[others[k]] <= max_size:
+                group.append(others[k])
+                size += load[others[k]]
+                free.remove(others[k])
+
+        groups.append(sorted(group))
+
+    return groups
+
+# Agrupamos los centros por biseccion recursiva de sus coordenadas:
+# un grupo que pasa de max_size tiendas se parte a la mitad (por numero
+# de tiendas) a lo largo de su coordenada mas extendida
+def group_by_coordinates(coordinates, load, max_size, members=None):
+    if members is None:
+        members = list(range(len(load)))
+
+    if len(members) == 1 or sum(load[c] for c in members) <= max_size:
+        return [sorted(members)]
+
+    points = coordinates[members]
+    axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+    ordered = [members[k] for k in np.argsort(points[:, axis], kind="stable")]
+
+    half = sum(load[c] for c in ordered) / 2
+    acc = 0
+    cut = 1
+    for (k, c) in enumerate(ordered[:-1]):
+        acc += load[c]
+        cut = k + 1
+        if acc >= half:
+            break
+
+    return group_by_coordinates(coordinates, load, max_size, ordered[:cut]) + \
+           group_by_coordinates(coordinates, load, max_size, ordered[cut:])
+
+# Partimos la red en clusters
+# Parametros de entrada:
+# max_size: Numero maximo de tiendas por cluster
+# coordinates: Arreglo N x 2 (latitud, longitud) de todos los nodos, si se
+#   da los centros se agrupan por coordenadas
+# Retorna:
+# Lista de clusters (group_centers, group_stores) con ids globales
+def partition(centers, stores, distances, max_size, coordinates=None):
+    (nearest, load) = nearest_centers(centers, stores, distances)
+
+    if coordinates is not None:
+        groups = group_by_coordinates(np.asarray(coordinates[:centers], dtype=np.float64), load, max_size)
+    else:
+        groups = group_by_distance(centers, distances, load, max_size)
+
+    clusters = []
+    for group in groups:
+        group_stores = centers + np.flatnonzero(np.isin(nearest, group))
+        clusters.append((group, group_stores.tolist()))
+
+    return clusters
+
+# Matriz de distancias de un cluster: primero sus centros y despues sus
+# tiendas, como espera solve
+def cluster_distances(distances, nodes):
+    nodes = np.asarray(nodes, dtype=np.int64)
+    return np.asarray(distances[nodes[:, None], nodes[None, :]], dtype=np.float64)
+
+# Resolvemos un cluster y regresamos sus rutas con ids globales
+def solve_cluster(distances, cluster, seed, max_time, solve_args):
+    (group, group_stores) = cluster
+    nodes = group + group_stores
+    random.seed(seed)
+
+    (routes, _, _) = Sistema_Enrutamiento.solve(len(group), len(group_stores),
+                                                cluster_distances(distances, nodes), max_time, **solve_args)
+    return [[nodes[node] for node in route] for route in routes]
+
+# Parametros de solve que la reparacion de fronteras fija por su cuenta
+REPAIR_ARGS = ("initial_routes", "granular_k")
+
+# Resolvemos un cluster en un proceso del pool, con la matriz compartida
+# que abre init_distances_worker
+def cluster_worker(cluster, seed, max_time, solve_args):
+    return solve_cluster(distances_state["distances"], cluster, seed, max_time, solve_args)
+
+# Busqueda por descomposicion
+# Parametros de entrada:
+# max_size: Numero maximo de tiendas por cluster
+# max_time: Tiempo total en segundos (clusters y reparacion)
+# repair_share: Fraccion de max_time para la reparacion de fronteras
+# workers: Procesos para resolver los clusters (None usa todos los nucleos,
+#   1 los resuelve en el proceso actual)
+# coordinates: Coordenadas de los nodos para agrupar (opcional)
+# granular_k: Vecinos cercanos que usa la reparacion de fronteras
+# seed: Semilla base, el cluster i usa seed + i
+# solve_args: Parametros extra para solve en cada cluster y en la reparacion
+# Retorna:
+# (best_routes, best_cost, steps) como solve, steps es el registro de la
+#   reparacion de fronteras
+def decomposed_solve(centers, stores, distances, max_size=200, max_time=10.0, repair_share=0.3,
+                     workers=None, coordinates=None, granular_k=10, seed=0, **solve_args):
+    deadline = time.time() + max_time
+    clusters = partition(centers, stores, distances, max_size, coordinates)
+
+    # Si hay mas clusters que procesos se resuelven por tandas, el tiempo
+    # de cada cluster se ajusta para terminar a tiempo
+    workers = workers if workers is not None else multiprocessing.cpu_count()
+    batches = -(-len(clusters) // workers)
+    cluster_time = max_time * (1 - repair_share) / batches
+    seeds = [seed + i for i in range(len(clusters))]
+
+    if workers == 1:
+        solved = [solve_cluster(distances, cluster, s, cluster_time, solve_args)
+                  for (cluster, s) in zip(clusters, seeds)]
+    else:
+        (block, distances_spec) = share_distances(distances)
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(clusters)), initializer=init_distances_worker,
+                                     initargs=(distances_spec,)) as pool:
+                solved = list(pool.map(cluster_worker, clusters, seeds, [cluster_time] * len(clusters),
+                                       [solve_args] * len(clusters)))
+        finally:
+            block.close()
+            block.unlink()
+
+    # Juntamos las rutas de los clusters en el orden de los centros
+    routes = [None] * centers
+    for cluster_routes in solved:
+        for route in cluster_routes:
+            routes[route[0]] = route
+
+    # Reparacion de fronteras sobre toda la red, con los mismos parametros
+    # que los clusters salvo las rutas iniciales y los vecindarios, que
+    # son propios de la reparacion
+    random.seed(seed)
+    repair_time = max(0.0, deadline - time.time())
+    repair_args = {key: value for (key, value) in solve_args.items() if key not in REPAIR_ARGS}
+    return Sistema_Enrutamiento.solve(centers, stores, distances, repair_time, initial_routes=routes,
+                                      granular_k=granular_k, **repair_args)
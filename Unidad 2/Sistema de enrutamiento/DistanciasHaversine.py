@@ -0,0 +1,99 @@
+import os
+import numpy as np
+import pandas as pd
+import CacheDistancias
+
+# Construccion de la matriz de distancias a partir de las coordenadas WGS84
+#   de store_distribution_data.csv, sin necesitar distance_matrix.csv.
+# La distancia entre dos nodos es la de haversine (gran circulo) en
+#   kilometros. La matriz se calcula por bloques de renglones con NumPy en
+#   el tipo de dato final (float32 por defecto) y cada bloque se escribe
+#   directo en un archivo .npy mapeado a memoria, asi una matriz de 20 000
+#   nodos (1.6 GB en float32) se construye usando solo la memoria de un
+#   bloque. Como la cache de CacheDistancias, el .npy se reconstruye solo
+#   si el CSV de coordenadas cambia.
+
+EARTH_RADIUS_KM = 6371.0
+
+# Distancias de haversine de un bloque de nodos contra todos los nodos
+# Parametros de entrada:
+# lat, lon: Latitud y longitud de todos los nodos en radianes
+# rows: Indices de los nodos del bloque
+# Retorna:
+# Matriz len(rows) x n con las distancias en kilometros (mismo tipo de
+#   dato que lat y lon)
+def haversine_rows(lat, lon, rows):
+    dlat = np.sin((lat[rows, None] - lat[None, :]) / 2)
+    dlon = np.sin((lon[rows, None] - lon[None, :]) / 2)
+
+    # h = sin^2(dlat / 2) + cos(lat1) cos(lat2) sin^2(dlon / 2), todo en
+    # el lugar para no crear mas matrices del tamaño del bloque
+    np.square(dlat, out=dlat)
+    np.square(dlon, out=dlon)
+    dlon *= np.cos(lat)[None, :]
+    dlon *= np.cos(lat[rows])[:, None]
+    dlat += dlon
+    np.clip(dlat, 0, 1, out=dlat)
+
+    np.sqrt(dlat, out=dlat)
+    np.arcsin(dlat, out=dlat)
+    dlat *= 2 * EARTH_RADIUS_KM
+    return dlat
+
+# Calcula la matriz completa y la escribe en npy_path
+# Parametros de entrada:
+# data_path: CSV con las columnas Latitud_WGS84 y Longitud_WGS84 (los
+#   nodos se numeran en el orden del archivo)
+# npy_path: Archivo .npy a escribir
+# dtype: Tipo de dato de la matriz
+# tile_rows: Renglones que se calculan a la vez
+def build_haversine(data_path, npy_path, dtype=np.float32, tile_rows=1024):
+    df = pd.read_csv(data_path)
+    lat = np.radians(df["Latitud_WGS84"].to_numpy(dtype=dtype))
+    lon = np.radians(df["Longitud_WGS84"].to_numpy(dtype=dtype))
+    n = len(df)
+
+    # Se escribe en un archivo temporal que se renombra al terminar, para
+    # que una construccion interrumpida nunca quede como valida
+    tmp_path = npy_path + ".tmp.npy"
+    matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(n, n))
+    for start in range(0, n, tile_rows):
+        rows = np.arange(start, min(n, start + tile_rows))
+        matrix[start:start + len(rows)] = haversine_rows(lat, lon, rows)
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, npy_path)
+
+    return n
+
+# Regresa la matriz de haversine de un CSV de coordenadas, construyendola
+#   solo si no existe o si el CSV cambio
+# Parametros de entrada:
+# data_path: CSV con las coordenadas de los centros y tiendas
+# dtype: Tipo de dato de la matriz (float32 por defecto)
+# cache_dir: Carpeta para el .npy (por defecto la del CSV)
+# tile_rows: Renglones que se calculan a la vez
+# Retorna:
+# La matriz como arreglo de NumPy de solo lectura mapeado a memoria
+def load_haversine(data_path="store_distribution_data.csv", dtype=np.float32, cache_dir=None, tile_rows=1024):
+    base = os.path.splitext(os.path.basename(data_path))[0]
+    directory = cache_dir if cache_dir is not None else os.path.dirname(os.path.abspath(data_path))
+    name = f"{base}.{np.dtype(dtype).name}.haversine"
+    npy_path = os.path.join(directory, name + ".npy")
+    meta_path = os.path.join(directory, name + ".json")
+
+    if not CacheDistancias.cache_is_valid(data_path, npy_path, meta_path):
+        n = build_haversine(data_path, npy_path, dtype, tile_rows)
+
+        stat = os.stat(data_path)
+        CacheDistancias.write_meta(meta_path, {
+            "csv": os.path.basename(data_path),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": CacheDistancias.file_hash(data_path),
+            "dtype": np.dtype(dtype).name,
+            "layout": "haversine",
+            "n": n,
+        })
+
+    return np.load(npy_path, mmap_mode='r')
@@ -0,0 +1,226 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from CacheDistancias import MatrizCondensada
+
+# Evaluacion en paralelo del vecindario de reubicaciones.
+# Las tiendas candidatas de cada iteracion se reparten entre un pool de
+#   procesos que vive durante toda la busqueda. La matriz de distancias,
+#   las listas de vecinos y la memoria tabu se copian una sola vez a
+#   memoria compartida (multiprocessing.shared_memory), por lo que nunca
+#   se serializan. Los arreglos de relocation_arrays de la solucion actual
+#   tambien viven en memoria compartida (su tamaño solo depende del numero
+#   de nodos y de rutas): en cada iteracion el proceso principal los copia
+#   ahi y a cada proceso solo se le envia el rango de tiendas a evaluar;
+#   cada uno regresa su mejor movimiento, que se reduce en el proceso
+#   principal.
+
+# Memoria compartida y vistas de NumPy de cada proceso del pool, se
+# crean al iniciar el proceso (init_worker)
+shared = {}
+
+# Copiamos un arreglo a un bloque de memoria compartida nuevo
+# Regresa (bloque, vista de NumPy sobre el bloque)
+def share_array(values):
+    values = np.ascontiguousarray(values)
+    block = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+    view = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+    view[...] = values
+    return (block, view)
+
+# Descripcion de un bloque compartido para abrirlo desde otro proceso
+def describe(block, view):
+    return (block.name, view.shape, view.dtype.str)
+
+# Abrimos un bloque compartido a partir de su descripcion
+def attach(spec):
+    (name, shape, dtype) = spec
+    block = shared_memory.SharedMemory(name=name)
+    return (block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+
+# Copiamos la matriz de distancias a memoria compartida (si es una
+# MatrizCondensada solo se copia su triangulo)
+# Regresa (bloque, descripcion para attach_distances)
+def share_distances(distances):
+    condensed_n = None
+    if isinstance(distances, MatrizCondensada):
+        condensed_n = distances.n
+        distances = distances.data
+
+    (block, view) = share_array(distances)
+    return (block, (describe(block, view), condensed_n))
+
+# Abrimos la matriz de distancias compartida desde otro proceso
+# Regresa (bloque, matriz)
+def attach_distances(spec):
+    (array_spec, condensed_n) = spec
+    (block, distances) = attach(array_spec)
+    if condensed_n is not None:
+        distances = MatrizCondensada(distances, condensed_n)
+    return (block, distances)
+
+# Matriz de distancias de los procesos de los pools que solo necesitan
+# la matriz (clusters de Descomposicion.py, islas de island_solve y
+# Servicio.py), se abre al iniciar cada proceso
+distances_state = {}
+
+# Inicializa un proceso de esos pools (la referencia al bloque se guarda
+# para que no se cierre)
+def init_distances_worker(distances_spec):
+    (block, distances) = attach_distances(distances_spec)
+    distances_state["block"] = block
+    distances_state["distances"] = distances
+
+# Inicializa cada proceso del pool con vistas a la memoria compartida
+# (las referencias a los bloques se guardan para que no se cierren)
+def init_worker(distances_spec, expiry_spec, attribute, neighbors_spec, arrays_spec):
+    import Sistema_Enrutamiento
+
+    (block, distances) = attach_distances(distances_spec)
+    shared["blocks"] = [block]
+    shared["distances"] = distances
+
+    (block, expiry) = attach(expiry_spec)
+    shared["blocks"].append(block)
+    N = expiry.shape[0]
+    routes_count = expiry.shape[1] if expiry.ndim == 2 else 1
+    tabu = Sistema_Enrutamiento.TabuMemory(N, routes_count, 1, attribute)
+    tabu.expiry = expiry
+    shared["tabu"] = tabu
+
+    shared["neighbors"] = None
+    if neighbors_spec is not None:
+        (block, neighbors) = attach(neighbors_spec)
+        shared["blocks"].append(block)
+        shared["neighbors"] = neighbors
+
+    shared["arrays"] = {}
+    for (key, spec) in arrays_spec.items():
+        (block, view) = attach(spec)
+        shared["blocks"].append(block)
+        shared["arrays"][key] = view
+
+    shared["module"] = Sistema_Enrutamiento
+
+# Evalua las tiendas candidatas start..stop - 1 (indices de los arreglos
+# store_*) en un proceso del pool
+# Regresa (costo, tienda, arista) de su mejor movimiento
+def score_candidates(cost, start, stop, iteration, aspiration, granular):
+    module = shared["module"]
+    arrays = shared["arrays"]
+    candidates = np.arange(start, stop, dtype=np.int64)
+    if granular:
+        (best_costs, best_edges) = module.best_relocations_granular(arrays, cost, shared["distances"], candidates,
+                                                                    shared["neighbors"], shared["tabu"],
+                                                                    iteration, aspiration)
+    else:
+        (best_costs, best_edges) = module.best_relocations_vectorized(arrays, cost, shared["distances"], candidates,
+                                                                      tabu=shared["tabu"], iteration=iteration,
+                                                                      aspiration=aspiration)
+
+    best = int(np.argmin(best_costs))
+    return (float(best_costs[best]), int(candidates[best]), int(best_edges[best]))
+
+# Clase que mantiene el pool de procesos y la memoria compartida durante
+#   una busqueda. Al crearla, la memoria tabu pasa a usar el bloque
+#   compartido, asi los cambios que hace el proceso principal los ven
+#   los procesos del pool sin enviarlos; close() la regresa a memoria local.
+# Se usa como administrador de contexto:
+#   with EvaluadorParalelo(distances, tabu, arrays, workers=8) as evaluator:
+#       (cost, store, edge) = evaluator.best_relocation(arrays, cost, iteration)
+class EvaluadorParalelo:
+
+    # Constructor de la clase EvaluadorParalelo
+    # Parametros de entrada:
+    # distances: Matriz de distancias (arreglo de NumPy, memmap o
+    #   MatrizCondensada)
+    # tabu: Memoria tabu (TabuMemory) de la busqueda
+    # arrays: arreglos de relocation_arrays de la solucion inicial, definen
+    #   el tamaño de los bloques compartidos de la solucion actual
+    # neighbors: Listas de vecinos cercanos (nearest_neighbors), opcional
+    # workers: Numero de procesos (None usa todos los nucleos)
+    def __init__(self, distances, tabu, arrays, neighbors=None, workers=None):
+        self.tabu = tabu
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.blocks = []
+        self.views = []
+
+        (block, distances_spec) = share_distances(distances)
+        self.blocks.append(block)
+
+        expiry_spec = self.share(tabu.expiry)
+        tabu.expiry = self.views[-1]
+
+        neighbors_spec = self.share(neighbors) if neighbors is not None else None
+
+        self.arrays = {}
+        arrays_spec = {}
+        for (key, values) in arrays.items():
+            arrays_spec[key] = self.share(values)
+            self.arrays[key] = self.views[-1]
+
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(),
+                                        initializer=init_worker,
+                                        initargs=(distances_spec, expiry_spec, tabu.attribute, neighbors_spec,
+                                                  arrays_spec))
+
+    # Copiamos un arreglo a memoria compartida y regresamos su descripcion
+    def share(self, values):
+        (block, view) = share_array(values)
+        self.blocks.append(block)
+        self.views.append(view)
+        return describe(block, view)
+
+    # Mejor reubicacion de todas las tiendas de la solucion actual
+    # Parametros de entrada:
+    # arrays: arreglos de relocation_arrays de la solucion actual
+    # cost: costo actual de la solucion
+    # iteration, aspiration: iteracion actual y costo de aspiracion
+    # granular: usar las listas de vecinos en lugar de todas las aristas
+    # Retorna:
+    # (costo, tienda, arista) con los indices de los arreglos de arrays
+    def best_relocation(self, arrays, cost, iteration, aspiration=float('-inf'), granular=False):
+        # Los procesos leen la solucion actual de los bloques compartidos
+        # (el pool no esta evaluando nada entre iteraciones)
+        for (key, view) in self.arrays.items():
+            view[...] = arrays[key]
+
+        stores = len(arrays["store_node"])
+        bounds = np.linspace(0, stores, min(self.workers, stores) + 1).astype(np.int64).tolist()
+
+        futures = [self.pool.submit(score_candidates, cost, start, stop, iteration, aspiration, granular)
+                   for (start, stop) in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+        # Reducimos en orden de bloques, para desempatar igual que la
+        # evaluacion en un solo proceso
+        best = (float('inf'), -1, -1)
+        for future in futures:
+            result = future.result()
+            if result[0] < best[0]:
+                best = result
+
+        return best
+
+    # Detenemos el pool, regresamos la memoria tabu a memoria local y
+    # liberamos los bloques compartidos
+    def close(self):
+        if self.pool is None:
+            return
+
+        self.pool.shutdown()
+        self.pool = None
+        self.tabu.expiry = self.tabu.expiry.copy()
+        self.views = []
+        self.arrays = {}
+
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
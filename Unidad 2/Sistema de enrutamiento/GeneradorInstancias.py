@@ -0,0 +1,95 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from DistanciasHaversine import haversine_rows
+
+# Generador de instancias sinteticas con varios centros de distribucion,
+#   con el mismo formato que store_distribution_data.csv y
+#   distance_matrix.csv, para probar el solucionador con redes de 100 a
+#   10 000 nodos.
+# Los nodos se colocan en la misma zona que la instancia original
+#   (Culiacan): los centros uniformemente y las tiendas la mitad
+#   uniformemente y la otra mitad agrupadas alrededor de los centros, como
+#   colonias alrededor de una zona comercial. La distancia entre dos nodos
+#   es la de haversine por un factor de rodeo (las calles no van en linea
+#   recta). Con la misma semilla se obtiene siempre la misma instancia.
+
+LATITUDE = (24.70, 24.90)
+LONGITUDE = (-107.50, -107.30)
+DETOUR = 1.3
+
+# Genera las coordenadas de una instancia
+# Retorna un DataFrame con las columnas de store_distribution_data.csv
+def generate_nodes(nodes, centers, seed):
+    rng = np.random.default_rng(seed)
+    stores = nodes - centers
+
+    center_lat = rng.uniform(*LATITUDE, centers)
+    center_lon = rng.uniform(*LONGITUDE, centers)
+
+    uniform = stores // 2
+    store_lat = rng.uniform(*LATITUDE, stores)
+    store_lon = rng.uniform(*LONGITUDE, stores)
+    around = rng.integers(0, centers, stores - uniform)
+    store_lat[uniform:] = np.clip(center_lat[around] + rng.normal(0, 0.01, len(around)), *LATITUDE)
+    store_lon[uniform:] = np.clip(center_lon[around] + rng.normal(0, 0.01, len(around)), *LONGITUDE)
+
+    return pd.DataFrame({
+        "Tipo": ["Centro de Distribución"] * centers + ["Tienda"] * stores,
+        "Nombre": [f"Centro de Distribución {i + 1}" for i in range(centers)] +
+                  [f"Tienda {i + 1}" for i in range(stores)],
+        "Latitud_WGS84": np.round(np.concatenate((center_lat, store_lat)), 6),
+        "Longitud_WGS84": np.round(np.concatenate((center_lon, store_lon)), 6),
+    })
+
+# Escribe la matriz de distancias en CSV por bloques de renglones, sin
+# tener la matriz completa en memoria
+def write_distance_matrix(path, df, tile_rows=256):
+    lat = np.radians(df["Latitud_WGS84"].to_numpy(dtype=np.float64))
+    lon = np.radians(df["Longitud_WGS84"].to_numpy(dtype=np.float64))
+    n = len(df)
+
+    with open(path, "w") as f:
+        f.write(",".join(f"Nodo_{i + 1}" for i in range(n)) + "\n")
+        for start in range(0, n, tile_rows):
+            rows = np.arange(start, min(n, start + tile_rows))
+            np.savetxt(f, haversine_rows(lat, lon, rows) * DETOUR, fmt="%.10g", delimiter=",")
+
+# Genera una instancia y la guarda en una carpeta
+# Parametros de entrada:
+# nodes: Numero total de nodos (centros y tiendas)
+# centers: Numero de centros de distribucion (por defecto nodes // 10,
+#   la misma proporcion que la instancia original)
+# seed: Semilla del generador
+# directory: Carpeta donde se escriben store_distribution_data.csv y
+#   distance_matrix.csv
+# Retorna:
+# (data_path, distances_path)
+def generate_instance(nodes, centers=None, seed=0, directory="."):
+    centers = centers if centers is not None else max(1, nodes // 10)
+    if not 0 < centers < nodes:
+        raise ValueError("Se necesita al menos un centro y una tienda")
+
+    os.makedirs(directory, exist_ok=True)
+    data_path = os.path.join(directory, "store_distribution_data.csv")
+    distances_path = os.path.join(directory, "distance_matrix.csv")
+
+    df = generate_nodes(nodes, centers, seed)
+    df.to_csv(data_path, index=False)
+    write_distance_matrix(distances_path, df)
+
+    return (data_path, distances_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de instancias de enrutamiento")
+    parser.add_argument("nodes", type=int)
+    parser.add_argument("--centers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = args.output if args.output is not None else os.path.join("instancias", f"n{args.nodes}_s{args.seed}")
+    (data_path, distances_path) = generate_instance(args.nodes, args.centers, args.seed, directory)
+    print(f"Instancia escrita en {data_path} y {distances_path}")
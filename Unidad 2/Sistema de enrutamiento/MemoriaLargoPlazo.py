@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+# Memoria de largo plazo de la busqueda tabu: un hash de cada solucion
+#   visitada, estilo Zobrist, para detectar cuando la busqueda regresa a
+#   soluciones que ya vio (esta ciclando).
+# El hash de una solucion es la suma (modulo 2^64) de una llave
+#   pseudoaleatoria de 64 bits por cada arista no dirigida de sus rutas
+#   (una ruta vacia [centro] tiene la arista (centro, centro)). Como las
+#   aristas determinan las rutas, dos soluciones distintas tienen hashes
+#   distintos salvo colisiones (probabilidad ~2^-64), y como los
+#   movimientos solo cambian unas pocas aristas el hash se actualiza en O(1):
+# reubicacion: quita (a, s), (s, c), (d, e) y agrega (a, c), (d, s), (s, e)
+# 2-opt: quita (a, b), (c, d) y agrega (a, c), (b, d) (el tramo invertido
+#   conserva sus aristas porque no son dirigidas)
+# Or-opt: quita (p, s0), (se, n), (u, v) y agrega (p, n), (u, s0), (se, v)
+# Se usa suma y no XOR para que la ruta [centro, tienda], que tiene dos
+#   veces la misma arista, no se anule.
+# Las llaves se calculan con splitmix64 en lugar de guardarse en una tabla
+#   de N x N, asi la memoria no depende del tamaño de la red.
+
+MASK = (1 << 64) - 1
+
+# Llave de 64 bits de la arista no dirigida (a, b)
+def edge_key(a, b):
+    if a > b:
+        (a, b) = (b, a)
+
+    # splitmix64
+    x = ((a << 32) | b) + 0x9E3779B97F4A7C15 & MASK
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & MASK
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & MASK
+    return x ^ (x >> 31)
+
+# Hash completo de una solucion (O(N), solo al inicio o al cambiar de
+# solucion de golpe)
+def solution_hash(routes):
+    h = 0
+    for route in routes:
+        for i in range(len(route)):
+            h += edge_key(route[i], route[(i + 1) % len(route)])
+    return h & MASK
+
+# Cambio del hash que produce un movimiento, con las rutas como estan antes
+# de aplicarlo. Recibe los movimientos de reubicacion (route_or, pos_or,
+# route_tg, pos_tg) y los de OperadoresIntraRuta ("2opt", ...), ("oropt", ...)
+def move_delta(routes, movs):
+    if movs[0] == "2opt":
+        (_, route, i, j) = movs
+        nodes = routes[route]
+        (a, b, c, d) = (nodes[i], nodes[i + 1], nodes[j], nodes[(j + 1) % len(nodes)])
+        removed = ((a, b), (c, d))
+        added = ((a, c), (b, d))
+    elif movs[0] == "oropt":
+        (_, route, p, length, q) = movs
+        nodes = routes[route]
+        (prev, s0) = (nodes[p - 1], nodes[p])
+        (se, nxt) = (nodes[p + length - 1], nodes[(p + length) % len(nodes)])
+        (u, v) = (nodes[q], nodes[(q + 1) % len(nodes)])
+        removed = ((prev, s0), (se, nxt), (u, v))
+        added = ((prev, nxt), (u, s0), (se, v))
+    else:
+        (route_or, pos_or, route_tg, pos_tg) = movs
+        origin = routes[route_or]
+        target = routes[route_tg]
+        (a, s, c) = (origin[pos_or - 1], origin[pos_or], origin[(pos_or + 1) % len(origin)])
+        (d, e) = (target[pos_tg], target[(pos_tg + 1) % len(target)])
+        removed = ((a, s), (s, c), (d, e))
+        added = ((a, c), (d, s), (s, e))
+
+    return sum(edge_key(x, y) for (x, y) in added) - sum(edge_key(x, y) for (x, y) in removed)
+
+# Hash de la solucion que resulta de aplicar movs
+def apply_delta(h, routes, movs):
+    return (h + move_delta(routes, movs)) & MASK
+
+# Tabla acotada de soluciones visitadas: guarda el hash de a lo mas
+#   capacity soluciones y, al llenarse, olvida la que se vio hace mas
+#   tiempo. Solo sirve para detectar ciclos: el vecindario de la solucion
+#   actual se sigue evaluando completo en cada iteracion.
+class VisitedTable:
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.table = OrderedDict()
+
+    def __contains__(self, h):
+        return h in self.table
+
+    def __len__(self):
+        return len(self.table)
+
+    # Registramos una solucion (si ya estaba pasa a ser la mas reciente)
+    def add(self, h):
+        if h in self.table:
+            self.table.move_to_end(h)
+        else:
+            self.table[h] = None
+        if len(self.table) > self.capacity:
+            self.table.popitem(last=False)
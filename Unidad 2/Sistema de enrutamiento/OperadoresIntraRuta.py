@@ -0,0 +1,210 @@
+import numpy as np
+
+# Operadores dentro de una misma ruta para la busqueda tabu de
+#   Sistema_Enrutamiento.py:
+# 2-opt: quita dos aristas (a, b) y (c, d) de la ruta y las cambia por
+#   (a, c) y (b, d) invirtiendo el tramo b..c, lo que deshace cruces.
+# Or-opt: mueve un tramo de 1 a 3 tiendas consecutivas a otra posicion
+#   de la misma ruta, conservando su orden.
+# Ambos calculan el cambio de costo en O(1) por movimiento (la matriz de
+#   distancias se asume simetrica, como la de distance_matrix.csv) y se
+#   evaluan con NumPy sobre los arreglos de relocation_arrays. Si se dan
+#   listas de vecinos cercanos (nearest_neighbors) solo se prueban
+#   movimientos que crean aristas hacia esos vecinos.
+# Los movimientos se representan como tuplas:
+#   ("2opt", ruta, i, j): invertir las posiciones i + 1..j
+#   ("oropt", ruta, p, largo, q): mover las posiciones p..p + largo - 1
+#       para que queden entre las posiciones q y q + 1
+
+# Regresa una mascara con los movimientos tabu que no cumplen aspiracion
+def forbidden_moves(tabu, stores, routes, iteration, costs, aspiration):
+    if tabu is None:
+        return np.zeros(len(stores), dtype=bool)
+    return tabu.element_mask(stores, routes, iteration) & (costs >= aspiration)
+
+# Parejas de aristas (e1, e2) de una misma ruta con e1 < e2 para 2-opt,
+#   por bloques de a lo mas block_size parejas para no crear arreglos
+#   enormes en rutas muy largas
+# Sin vecinos son todas las parejas de cada ruta (en el orden de
+#   np.triu_indices); con vecinos, para cada nodo x y cada vecino y en la
+#   misma ruta se toma la pareja que crea la arista (x, y)
+def two_opt_pairs(arrays, neighbors=None, block_size=1 << 22):
+    if neighbors is not None:
+        x = arrays["edge_from"]
+        ex = arrays["node_edge"][x][:, None]
+        ey = arrays["node_edge"][neighbors[x]]
+        same = arrays["edge_route"][ex] == arrays["edge_route"][ey]
+        ex = np.broadcast_to(ex, ey.shape)[same]
+        ey = ey[same]
+        yield (np.minimum(ex, ey), np.maximum(ex, ey))
+        return
+
+    for (start, length) in zip(arrays["route_start"].tolist(), arrays["route_len"].tolist()):
+        rows = max(1, block_size // max(1, length))
+        for first in range(0, length - 2, rows):
+            # Renglones i del bloque, cada uno con las j = i + 2..length - 1
+            i = np.arange(first, min(length - 2, first + rows))
+            counts = length - i - 2
+            ends = np.cumsum(counts)
+            i = np.repeat(i, counts)
+            j = np.arange(ends[-1]) - np.repeat(ends - counts, counts) + i + 2
+            yield (start + i, start + j)
+
+# Mejor movimiento 2-opt de la solucion
+# Parametros de entrada:
+# arrays: arreglos de relocation_arrays de la solucion actual
+# cost: costo actual de la solucion
+# distances: matriz de distancias
+# neighbors: listas de vecinos cercanos (opcional)
+# tabu, iteration, aspiration: memoria tabu, iteracion actual y costo
+#   por debajo del cual se aceptan movimientos tabu
+# block_size: maximo de parejas que se evaluan a la vez
+# Retorna:
+# (costo, movimiento) o (inf, ()) si no hay movimientos posibles
+def best_two_opt(arrays, cost, distances, neighbors=None, tabu=None, iteration=0,
+                 aspiration=float('-inf'), block_size=1 << 22):
+    best_cost = float('inf')
+    best_move = ()
+
+    for (e1, e2) in two_opt_pairs(arrays, neighbors, block_size):
+        # Se descartan las parejas que no cambian la ruta: aristas seguidas
+        # o la primera con la ultima (invertir toda la ruta)
+        start = arrays["route_start"][arrays["edge_route"][e1]]
+        length = arrays["route_len"][arrays["edge_route"][e1]]
+        valid = (e2 - e1 > 1) & ~((e1 == start) & (e2 == start + length - 1))
+        e1 = e1[valid]
+        e2 = e2[valid]
+        if len(e1) == 0:
+            continue
+
+        a = arrays["edge_from"][e1]
+        b = arrays["edge_to"][e1]
+        c = arrays["edge_from"][e2]
+        d = arrays["edge_to"][e2]
+        delta = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+        costs = cost + np.asarray(delta, dtype=np.float64)
+
+        routes = arrays["edge_route"][e1]
+        costs[forbidden_moves(tabu, b, routes, iteration, costs, aspiration)] = np.inf
+        costs[forbidden_moves(tabu, c, routes, iteration, costs, aspiration)] = np.inf
+
+        # Los bloques van en orden, asi que con < se desempata igual que
+        # con un solo argmin sobre todas las parejas
+        best = int(np.argmin(costs))
+        if costs[best] < best_cost:
+            route = int(routes[best])
+            i = int(e1[best] - arrays["route_start"][route])
+            j = int(e2[best] - arrays["route_start"][route])
+            best_cost = float(costs[best])
+            best_move = ("2opt", route, i, j)
+
+    return (best_cost, best_move)
+
+# Tramos de largo "length" de cada ruta (sin incluir al centro en la
+# posicion 0). Regresa la arista (posicion global) de su primer nodo
+def segments(arrays, length):
+    first = []
+    for (start, route_len) in zip(arrays["route_start"].tolist(), arrays["route_len"].tolist()):
+        first.append(np.arange(start + 1, start + route_len - length + 1))
+    return np.concatenate(first) if first else np.empty(0, dtype=np.int64)
+
+# Mejor movimiento Or-opt de la solucion (mismos parametros que best_two_opt)
+# max_length: largo maximo de los tramos a mover
+# block_size: maximo de elementos de la matriz tramos x aristas que se
+#   evalua a la vez
+def best_or_opt(arrays, cost, distances, neighbors=None, tabu=None, iteration=0,
+                aspiration=float('-inf'), max_length=3, block_size=1 << 22):
+    # Aristas candidatas por tramo: toda su ruta, o 2k con los vecinos
+    if neighbors is None:
+        width = int(arrays["route_len"].max())
+    else:
+        width = 2 * neighbors.shape[1]
+    rows = max(1, block_size // max(1, width))
+
+    best_cost = float('inf')
+    best_move = ()
+
+    for length in range(1, max_length + 1):
+        seg = segments(arrays, length)
+        for first in range(0, len(seg), rows):
+            (cost_act, move) = best_or_opt_block(arrays, cost, distances, neighbors, tabu, iteration, aspiration,
+                                                 seg[first:first + rows], length)
+            if cost_act < best_cost:
+                (best_cost, best_move) = (cost_act, move)
+
+    return (best_cost, best_move)
+
+# Mejor movimiento Or-opt de un bloque de tramos del mismo largo
+def best_or_opt_block(arrays, cost, distances, neighbors, tabu, iteration, aspiration, seg, length):
+    edge_from = arrays["edge_from"]
+    edge_to = arrays["edge_to"]
+    edge_route = arrays["edge_route"]
+    edge_pos = arrays["edge_pos"]
+
+    prev = edge_from[seg - 1]
+    s0 = edge_from[seg]
+    se = edge_from[seg + length - 1]
+    nxt = edge_to[seg + length - 1]
+    route = edge_route[seg]
+    pos = edge_pos[seg]
+    removal = distances[prev, nxt] - distances[prev, s0] - distances[se, nxt]
+
+    # Aristas (u, v) donde se puede insertar el tramo
+    if neighbors is None:
+        width = int(arrays["route_len"][route].max())
+        offset = np.arange(width)[None, :]
+        edges = arrays["route_start"][route][:, None] + offset
+        outside = offset >= arrays["route_len"][route][:, None]
+        edges = np.where(outside, seg[:, None], edges)
+    else:
+        after = arrays["node_edge"][neighbors[s0]]
+        before_target = arrays["node_edge"][neighbors[se]]
+        target_route = edge_route[before_target]
+        before = arrays["route_start"][target_route] + \
+                 (edge_pos[before_target] - 1) % arrays["route_len"][target_route]
+        edges = np.concatenate((after, before), axis=1)
+        outside = edge_route[edges] != route[:, None]
+
+    # No se puede insertar en las aristas que tocan al tramo
+    touching = (edge_pos[edges] >= pos[:, None] - 1) & (edge_pos[edges] <= pos[:, None] + length - 1)
+    u = edge_from[edges]
+    v = edge_to[edges]
+    insertion = distances[u, s0[:, None]] + distances[se[:, None], v] - distances[u, v]
+    costs = cost + removal[:, None] + np.asarray(insertion, dtype=np.float64)
+    costs[outside | touching] = np.inf
+
+    forbidden = forbidden_moves(tabu, s0, route, iteration, costs.min(axis=1), aspiration)
+    costs[forbidden] = np.inf
+
+    flat = int(np.argmin(costs))
+    (row, col) = np.unravel_index(flat, costs.shape)
+    if costs[row, col] == np.inf:
+        return (float('inf'), ())
+    return (float(costs[row, col]), ("oropt", int(route[row]), int(pos[row]), length, int(edge_pos[edges[row, col]])))
+
+# Aplicamos un movimiento 2-opt u Or-opt sobre la ruta en el lugar y
+# actualizamos el indice tienda -> (ruta, posicion) de las posiciones que
+# cambiaron. Regresa las tiendas movidas (para la memoria tabu)
+def apply_intra_move(routes, move, route_of, pos_of):
+    route = move[1]
+    nodes = routes[route]
+
+    if move[0] == "2opt":
+        (_, _, i, j) = move
+        nodes[i + 1:j + 1] = nodes[i + 1:j + 1][::-1]
+        changed = range(i + 1, j + 1)
+        moved = [nodes[i + 1], nodes[j]]
+    else:
+        (_, _, p, length, q) = move
+        segment = nodes[p:p + length]
+        del nodes[p:p + length]
+        target = q + 1 if q < p else q + 1 - length
+        nodes[target:target] = segment
+        changed = range(min(p, target), max(p, target) + length)
+        moved = [segment[0]]
+
+    for j in changed:
+        route_of[nodes[j]] = route
+        pos_of[nodes[j]] = j
+
+    return moved
@@ -0,0 +1,57 @@
+import os
+import numpy as np
+
+# Puntos de control (checkpoints) de la busqueda tabu de
+#   Sistema_Enrutamiento.py.
+# Cada punto de control es un archivo .npz con lo necesario para continuar
+#   la busqueda exactamente donde se quedo:
+# routes, best_routes: rutas actuales y mejores, cada una como una sola
+#   lista de enteros (ver encode_routes)
+# cost, best_cost: sus costos
+# iteration: numero de iteracion (las expiraciones tabu dependen de el)
+# tabu_expiry, tabu_attribute: estado de la memoria tabu
+# rng_state, rng_gauss: estado del generador random de Python
+# El registro de costos (steps) no se guarda para que el archivo se
+#   mantenga pequeño; al continuar se empieza un registro nuevo.
+
+# Guarda un punto de control (se escribe en un archivo temporal y luego
+#   se renombra, para que una escritura interrumpida no deje un archivo
+#   a medias)
+# Parametros de entrada:
+# path: Ruta del archivo .npz
+# state: Diccionario con las llaves descritas arriba; rng_state es el
+#   resultado de random.getstate()
+def save_checkpoint(path, state):
+    (version, internal, gauss) = state["rng_state"]
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f,
+                 routes=np.asarray(state["routes"], dtype=np.int32),
+                 best_routes=np.asarray(state["best_routes"], dtype=np.int32),
+                 cost=np.float64(state["cost"]),
+                 best_cost=np.float64(state["best_cost"]),
+                 iteration=np.int64(state["iteration"]),
+                 tabu_expiry=state["tabu_expiry"],
+                 tabu_attribute=np.str_(state["tabu_attribute"]),
+                 rng_version=np.int64(version),
+                 rng_state=np.asarray(internal, dtype=np.uint32),
+                 rng_gauss=np.float64(np.nan if gauss is None else gauss))
+    os.replace(tmp_path, path)
+
+# Lee un punto de control
+# Retorna un diccionario con las mismas llaves que recibe save_checkpoint
+def load_checkpoint(path):
+    with np.load(path) as data:
+        gauss = float(data["rng_gauss"])
+        return {
+            "routes": data["routes"].tolist(),
+            "best_routes": data["best_routes"].tolist(),
+            "cost": float(data["cost"]),
+            "best_cost": float(data["best_cost"]),
+            "iteration": int(data["iteration"]),
+            "tabu_expiry": data["tabu_expiry"].copy(),
+            "tabu_attribute": str(data["tabu_attribute"]),
+            "rng_state": (int(data["rng_version"]), tuple(data["rng_state"].tolist()),
+                          None if np.isnan(gauss) else gauss),
+        }
@@ -0,0 +1,269 @@
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import Sistema_Enrutamiento
+from Descomposicion import cluster_distances
+from EvaluacionParalela import share_distances, init_distances_worker, distances_state
+
+# Servicio local del sistema de enrutamiento.
+# La red (matriz de distancias y datos de tiendas) se carga una sola vez al
+#   iniciar y la matriz se pone en memoria compartida para un pool de
+#   procesos que resuelve las peticiones en paralelo, sin volver a importar
+#   pandas ni leer los CSV en cada peticion.
+# Peticiones (HTTP con JSON):
+# GET /health: numero de centros y tiendas cargados
+# POST /solve: resuelve con la busqueda tabu; el cuerpo es un objeto con
+#   stores: ids de nodo o nombres de las tiendas a visitar (por defecto
+#       todas)
+#   max_time: tiempo de busqueda en segundos (por defecto 10, a lo mas el
+#       limite del servicio, MAX_TIME por defecto)
+#   initial_routes: rutas de arranque con ids de nodo (arranque en caliente)
+#   seed: semilla de la busqueda
+#   options: parametros extra para solve (tenure, granular_k, ...)
+#   y regresa routes (ids de nodo), names (nombres), route_costs, cost e
+#   iterations. Una peticion invalida regresa 400 y un error al resolverla
+#   500, ambos con un objeto {"error": mensaje}.
+# Los ids de nodo son los indices de la matriz: los centros son 0..C - 1 y
+#   las tiendas C..N - 1.
+
+# Opciones de solve que se pueden mandar en una peticion
+ALLOWED_OPTIONS = {"tenure", "tabu_attribute", "aspiration", "granular_k", "full_every", "operators",
+                   "visited_size", "diversify_moves", "target_cost"}
+
+# Tiempo maximo de busqueda por peticion (segundos), para que una peticion
+# no ocupe un proceso del pool indefinidamente
+MAX_TIME = 300.0
+
+# Regresa True si value es un entero (no booleano) mayor o igual a minimum
+def is_integer(value, minimum):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+# Regresa True si value es un numero (no booleano)
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Revisamos las opciones de solve de una peticion y regresamos una copia
+# lista para pasarla a solve (ValueError si alguna no es valida)
+def parse_options(options):
+    if not isinstance(options, dict):
+        raise ValueError("options debe ser un objeto JSON")
+
+    unknown = set(options) - ALLOWED_OPTIONS
+    if unknown:
+        raise ValueError(f"Opciones no permitidas: {sorted(unknown)}")
+
+    options = dict(options)
+    for key in ("granular_k", "full_every", "visited_size", "diversify_moves"):
+        if key in options and not is_integer(options[key], 1):
+            raise ValueError(f"{key} debe ser un entero mayor o igual a 1")
+
+    if "tenure" in options:
+        tenure = options["tenure"]
+        if isinstance(tenure, list) and len(tenure) == 2 and all(is_integer(t, 1) for t in tenure) and \
+                tenure[0] <= tenure[1]:
+            options["tenure"] = tuple(tenure)
+        elif not is_integer(tenure, 1):
+            raise ValueError("tenure debe ser un entero mayor o igual a 1 o [minimo, maximo]")
+
+    if "tabu_attribute" in options and options["tabu_attribute"] not in ("store", "store_route"):
+        raise ValueError("tabu_attribute debe ser \"store\" o \"store_route\"")
+
+    if "aspiration" in options and not isinstance(options["aspiration"], bool):
+        raise ValueError("aspiration debe ser true o false")
+
+    if "operators" in options:
+        operators = options["operators"]
+        if not isinstance(operators, list) or not operators or \
+                not set(operators) <= {"relocate", "2opt", "oropt"}:
+            raise ValueError("operators debe ser una lista con \"relocate\", \"2opt\" y/o \"oropt\"")
+        options["operators"] = tuple(operators)
+
+    if "target_cost" in options and not is_number(options["target_cost"]):
+        raise ValueError("target_cost debe ser un numero")
+
+    return options
+
+# Resolvemos una peticion en un proceso del pool
+# Parametros de entrada:
+# centers: Numero de centros de la red
+# stores: Ids de nodo de las tiendas a visitar
+# max_time, initial_routes, seed, options: ver el encabezado del modulo
+# Retorna:
+# (routes, route_costs, cost, iterations) con ids de nodo de la red
+def solve_request(centers, stores, max_time, initial_routes, seed, options):
+    distances = distances_state["distances"]
+    nodes = list(range(centers)) + stores
+
+    # Si se pide un subconjunto de tiendas se resuelve sobre su submatriz
+    # y las rutas se traducen entre ids de la red e ids locales
+    full = len(nodes) == distances.shape[0]
+    local_distances = distances if full else cluster_distances(distances, nodes)
+    local_of = {node: i for (i, node) in enumerate(nodes)}
+
+    if initial_routes is not None:
+        initial_routes = [[local_of[node] for node in route if node in local_of] for route in initial_routes]
+
+    if seed is not None:
+        random.seed(seed)
+
+    stats = {}
+    (routes, cost, _) = Sistema_Enrutamiento.solve(centers, len(stores), local_distances, max_time,
+                                                   initial_routes=initial_routes, stats=stats, **options)
+
+    route_costs = [float(c) for c in Sistema_Enrutamiento.calculate_route_costs(routes, local_distances)]
+    routes = [[nodes[node] for node in route] for route in routes]
+    return (routes, route_costs, float(sum(route_costs)), stats["iterations"])
+
+# Clase del servicio: carga la red, crea el pool y atiende peticiones HTTP
+class ServicioEnrutamiento:
+
+    # Parametros de entrada:
+    # distances: Matriz de distancias de toda la red
+    # centers, stores: Registros de read_store_data
+    # workers: Procesos del pool (None usa todos los nucleos)
+    # max_time: Tiempo maximo de busqueda que puede pedir una peticion
+    def __init__(self, distances, centers, stores, workers=None, max_time=MAX_TIME):
+        self.max_time = max_time
+        self.centers = len(centers)
+        self.stores = len(stores)
+        self.names = [c["Nombre"] for c in centers] + [s["Nombre"] for s in stores]
+        self.node_of = {name: i for (i, name) in enumerate(self.names)}
+
+        (self.block, distances_spec) = share_distances(distances)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=init_distances_worker,
+                                        initargs=(distances_spec,))
+
+    # Revisamos una peticion y la convertimos en los parametros de
+    # solve_request (ValueError si no es valida)
+    def parse_request(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("La peticion debe ser un objeto JSON")
+
+        N = self.centers + self.stores
+        stores = request.get("stores")
+        if stores is None:
+            stores = list(range(self.centers, N))
+        elif not isinstance(stores, list):
+            raise ValueError("stores debe ser una lista")
+        else:
+            ids = []
+            for store in stores:
+                node = self.node_of.get(store) if isinstance(store, str) else store
+                if not is_integer(node, self.centers) or node >= N:
+                    raise ValueError(f"Tienda desconocida: {store}")
+                ids.append(node)
+            stores = sorted(set(ids))
+
+        max_time = request.get("max_time", 10.0)
+        if not is_number(max_time) or not 0 <= max_time <= self.max_time:
+            raise ValueError(f"max_time debe estar entre 0 y {self.max_time} segundos")
+
+        initial_routes = request.get("initial_routes")
+        if initial_routes is not None:
+            if not isinstance(initial_routes, list) or \
+                    not all(isinstance(route, list) and all(is_integer(node, 0) for node in route)
+                            for route in initial_routes):
+                raise ValueError("initial_routes debe ser una lista de rutas con ids de nodo")
+
+        seed = request.get("seed")
+        if seed is not None and not is_integer(seed, 0):
+            raise ValueError("seed debe ser un entero no negativo")
+
+        options = parse_options(request.get("options", {}))
+
+        return (self.centers, stores, float(max_time), initial_routes, seed, options)
+
+    # Resolvemos una peticion (bloquea hasta que el pool la termine)
+    def solve(self, request):
+        return self.run(self.parse_request(request))
+
+    # Resolvemos en el pool los parametros ya revisados de una peticion
+    def run(self, params):
+        future = self.pool.submit(solve_request, *params)
+        (routes, route_costs, cost, iterations) = future.result()
+        return {
+            "routes": routes,
+            "names": [[self.names[node] for node in route] for route in routes],
+            "route_costs": route_costs,
+            "cost": cost,
+            "iterations": iterations,
+        }
+
+    # Creamos el servidor HTTP; cada peticion se atiende en su propio hilo
+    # y espera a que el pool la resuelva
+    def server(self, host="127.0.0.1", port=8080):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def send_json(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_json(404, {"error": f"Ruta desconocida: {self.path}"})
+                    return
+                self.send_json(200, {"centers": service.centers, "stores": service.stores})
+
+            def do_POST(self):
+                if self.path != "/solve":
+                    self.send_json(404, {"error": f"Ruta desconocida: {self.path}"})
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    params = service.parse_request(request)
+                except (ValueError, KeyError, TypeError) as error:
+                    self.send_json(400, {"error": str(error)})
+                    return
+
+                # Un error al resolver (por ejemplo de un proceso del pool)
+                # tambien recibe respuesta
+                try:
+                    response = service.run(params)
+                except Exception as error:
+                    self.send_json(500, {"error": f"{type(error).__name__}: {error}"})
+                    return
+                self.send_json(200, response)
+
+        return ThreadingHTTPServer((host, port), Handler)
+
+    # Detenemos el pool y liberamos la memoria compartida
+    def close(self):
+        self.pool.shutdown()
+        self.block.close()
+        self.block.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local del sistema de enrutamiento")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-time", type=float, default=MAX_TIME)
+    parser.add_argument("--distances", default="distance_matrix.csv")
+    parser.add_argument("--data", default="store_distribution_data.csv")
+    parser.add_argument("--source", choices=["csv", "haversine"], default="csv")
+    args = parser.parse_args()
+
+    distances = Sistema_Enrutamiento.read_distances(args.distances, source=args.source, data_path=args.data)
+    (centers, stores) = Sistema_Enrutamiento.read_store_data(args.data)
+
+    service = ServicioEnrutamiento(distances, centers, stores, args.workers, args.max_time)
+    server = service.server(args.host, args.port)
+    print(f"Servicio en http://{args.host}:{args.port} ({len(centers)} centros, {len(stores)} tiendas)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
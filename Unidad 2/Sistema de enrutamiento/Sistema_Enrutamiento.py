@@ -1,22 +1,45 @@
 import pandas as pd
+import numpy as np
+import multiprocessing
+import os
 import random
 import time
-from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import CacheDistancias
+import DistanciasHaversine
+import MemoriaLargoPlazo
+import OperadoresIntraRuta
+import PuntosControl
+from EvaluacionParalela import EvaluadorParalelo, share_distances, init_distances_worker, distances_state
 
 # Leer las matrices de distancias
-def read_distances():
-    distances_df = pd.read_csv("distance_matrix.csv")
-
-    # Separacion de titulos a valores (quiza se usa luego)
-    nombres_nodos = distances_df.columns.tolist()
-
-    distances = distances_df.values.tolist()
-
-    return distances
+# La primera vez se interpreta el CSV y se guarda una cache binaria (.npy),
+# las siguientes se abre la cache mapeada a memoria (ver CacheDistancias.py)
+# dtype: np.float64 o np.float32 (la mitad de memoria)
+# condensed: guardar solo el triangulo superior si la matriz es simetrica
+# cache: si es False se lee el CSV directamente sin usar la cache
+# source: "csv" para leer path, o "haversine" para calcular la matriz con
+# las coordenadas de data_path (ver DistanciasHaversine.py); en ese caso
+# dtype es float32 si no se indica otro
+def read_distances(path="distance_matrix.csv", dtype=None, condensed=False, cache=True, source="csv",
+                   data_path="store_distribution_data.csv"):
+    if source == "haversine":
+        if condensed:
+            raise ValueError("La matriz de haversine solo se guarda completa")
+        return DistanciasHaversine.load_haversine(data_path, dtype if dtype is not None else np.float32)
+    if source != "csv":
+        raise ValueError(f"Fuente de distancias desconocida: {source}")
+
+    dtype = dtype if dtype is not None else np.float64
+    if not cache:
+        distances_df = pd.read_csv(path)
+        return distances_df.to_numpy(dtype=dtype)
+
+    return CacheDistancias.load_distances(path, dtype=dtype, condensed=condensed)
 
 # Leer el Data sobre las tiendas y centros de distribucion
-def read_store_data():
-    df = pd.read_csv("store_distribution_data.csv")
+def read_store_data(path="store_distribution_data.csv"):
+    df = pd.read_csv(path)
 
     centers = df[df["Tipo"] == "Centro de Distribución"]
     stores = df[df["Tipo"] == "Tienda"]
@@ -46,19 +69,115 @@ def generate_initial_solve(centers, stores, distance):
     
     return routes
 
-# Calculamos el costo de una solucion
+# Adaptamos unas rutas de una corrida anterior (por ejemplo el plan de
+# ayer) a las tiendas actuales para usarlas como solucion inicial:
+# se quitan los nodos que ya no existen o estan repetidos y cada tienda
+# que falta se inserta en la arista donde cuesta menos
+def repair_routes(routes, centers, stores, distances):
+    N = centers + stores
+    repaired = [[i] for i in range(centers)]
+    seen = set()
+
+    for i in range(min(centers, len(routes))):
+        for node in routes[i][1:]:
+            if centers <= node < N and node not in seen:
+                seen.add(node)
+                repaired[i].append(node)
+
+    for store in range(centers, N):
+        if store in seen:
+            continue
+
+        # Aristas (a, b) de todas las rutas con su ruta y posicion
+        edges = [(route, pos) for route in range(centers) for pos in range(len(repaired[route]))]
+        a = np.array([repaired[route][pos] for (route, pos) in edges])
+        b = np.array([repaired[route][(pos + 1) % len(repaired[route])] for (route, pos) in edges])
+        insertion = np.asarray(distances[a, store] + distances[store, b] - distances[a, b], dtype=np.float64)
+        (route, pos) = edges[int(np.argmin(insertion))]
+        repaired[route].insert(pos + 1, store)
+
+    return repaired
+
+# Calculamos el costo de una solucion (cada ruta es un ciclo cerrado
+# que sale y regresa a su centro)
 def calculate_cost(routes, centers, distance):
     cost = 0
     for i in range(centers):
-        stores = len(routes[i])
-        for j in range(stores):
-            cost += distance[j][(j + 1) % stores]
+        cost += route_cost(routes[i], distance)
+    return cost
+
+# Calculamos el costo de una sola ruta cerrada
+def route_cost(route, distance):
+    cost = 0
+    stores = len(route)
+    for j in range(stores):
+        cost += distance[route[j]][route[(j + 1) % stores]]
     return cost
 
+# Calculamos el costo de todas las rutas en una sola pasada vectorizada:
+# se concatenan los nodos de todas las rutas con su siguiente nodo
+# y se suman las distancias por ruta
+def calculate_route_costs(routes, distances):
+    nodes = np.concatenate([np.asarray(route, dtype=np.int64) for route in routes])
+    succ = np.concatenate([np.roll(np.asarray(route, dtype=np.int64), -1) for route in routes])
+    starts = np.cumsum([0] + [len(route) for route in routes[:-1]])
+
+    return np.add.reduceat(np.asarray(distances[nodes, succ], dtype=np.float64), starts)
+
+# Libro de costos por ruta: guarda el costo real (ciclo cerrado) de cada
+# ruta y el total, y al aplicar una relocalizacion solo actualiza las dos
+# rutas afectadas con el cambio de costo de la remocion y de la insercion
+class RouteCostLedger:
+
+    # routes: rutas de la solucion, distances: matriz de distancias
+    def __init__(self, routes, distances):
+        self.distances = distances
+        self.recompute(routes)
+
+    # Recalcula todos los costos de forma vectorizada
+    # Regresa la diferencia entre el total que se llevaba y el real
+    # (para revisar que las actualizaciones incrementales no se desvien)
+    def recompute(self, routes):
+        costs = calculate_route_costs(routes, self.distances)
+        old_total = getattr(self, "total", None)
+
+        self.costs = costs.tolist()
+        self.total = float(costs.sum())
+
+        return 0.0 if old_total is None else old_total - self.total
+
+    # Actualiza los costos de las rutas afectadas por movs, debe llamarse
+    # con las rutas de ANTES de aplicar el movimiento
+    def apply_relocation(self, routes, movs):
+        (route_or, pos_or, route_tg, pos_tg) = movs
+        distances = self.distances
+
+        store = routes[route_or][pos_or]
+        a = routes[route_or][pos_or - 1]
+        c = routes[route_or][(pos_or + 1) % len(routes[route_or])]
+        removal = distances[a, c] - (distances[a, store] + distances[store, c])
+
+        d = routes[route_tg][pos_tg]
+        e = routes[route_tg][(pos_tg + 1) % len(routes[route_tg])]
+        insertion = (distances[d, store] + distances[store, e]) - distances[d, e]
+
+        self.costs[route_or] += float(removal)
+        self.costs[route_tg] += float(insertion)
+        self.total += float(removal + insertion)
+
+    # Actualiza el costo de una ruta que cambio por delta (movimientos
+    # dentro de una sola ruta como 2-opt y Or-opt)
+    def apply_delta(self, route, delta):
+        self.costs[route] += delta
+        self.total += delta
+
 # Encontramos cual es la mejor relocalizacion para una tienda dada con una
 # solucion anterior, la relocalizacion puede ser en la misma ruta o en una
 # diferente
-def best_relocation(routes, cost, centers, distances, pos_store):
+# tabu: memoria tabu (TabuMemory), mover la tienda a una ruta tabu en la
+# iteracion dada solo se acepta si el movimiento cuesta menos que aspiration
+def best_relocation(routes, cost, centers, distances, pos_store, tabu=None, iteration=0,
+                    aspiration=float('-inf')):
     (route, pos) = pos_store
     store = routes[route][pos]
     a = routes[route][pos - 1]
@@ -68,6 +187,7 @@ def best_relocation(routes, cost, centers, distances, pos_store):
     best_relocation = float('inf')
     movs = ()
     for i in range(centers):
+        is_tabu = tabu is not None and tabu.is_tabu(store, i, iteration)
         lenRoute = len(routes[i])
         for j in range(lenRoute):
             if route == i and (pos == j or pos - 1 == j):
@@ -75,86 +195,689 @@ def best_relocation(routes, cost, centers, distances, pos_store):
             d = routes[i][j]
             e = routes[i][(j + 1) % lenRoute]
             cost_act = cost + cost1 + (distances[d][store] + distances[store][e]) - distances[d][e]
+            if is_tabu and cost_act >= aspiration:
+                continue
             if cost_act < best_relocation:
                 best_relocation = cost_act
                 movs = (route, pos, i, j)
     
     return (best_relocation, movs)
 
-# Generamos el vecino dado una solucion anterior y los movimientos que se deben de hacer
-def generate_neighbor(routes, movs):
+# Arreglos con la estructura de una solucion para los calculos vectorizados
+# Regresa un diccionario con:
+# edge_from, edge_to: nodos de cada arista (d, e) donde se puede insertar
+# edge_route, edge_pos: ruta y posicion de d en su ruta
+# store_node, store_route, store_pos: cada tienda (posicion >= 1) con su
+# ruta y posicion, store_prev y store_next sus vecinos en la ruta
+def relocation_arrays(routes):
+    edge_from = []
+    edge_to = []
+    edge_route = []
+    edge_pos = []
+    store_route = []
+    store_pos = []
+    for i in range(len(routes)):
+        lenRoute = len(routes[i])
+        edge_from.extend(routes[i])
+        edge_to.extend(routes[i][1:])
+        edge_to.append(routes[i][0])
+        edge_route.extend([i] * lenRoute)
+        edge_pos.extend(range(lenRoute))
+        store_route.extend([i] * (lenRoute - 1))
+        store_pos.extend(range(1, lenRoute))
+
+    arrays = {
+        "edge_from": np.array(edge_from, dtype=np.int64),
+        "edge_to": np.array(edge_to, dtype=np.int64),
+        "edge_route": np.array(edge_route, dtype=np.int64),
+        "edge_pos": np.array(edge_pos, dtype=np.int64),
+        "store_route": np.array(store_route, dtype=np.int64),
+        "store_pos": np.array(store_pos, dtype=np.int64),
+    }
+
+    # Las tiendas son las aristas que no salen de la posicion 0, su
+    # anterior es el d de la arista previa y su siguiente el e de la suya
+    is_store = arrays["edge_pos"] > 0
+    arrays["store_node"] = arrays["edge_from"][is_store]
+    arrays["store_next"] = arrays["edge_to"][is_store]
+    arrays["store_prev"] = arrays["edge_from"][np.flatnonzero(is_store) - 1]
+
+    # Arista que sale de cada nodo (cada nodo aparece una sola vez en las
+    # rutas) y donde empieza cada ruta, para los vecindarios granulares
+    arrays["node_edge"] = np.empty(len(edge_from), dtype=np.int64)
+    arrays["node_edge"][arrays["edge_from"]] = np.arange(len(edge_from))
+    arrays["route_len"] = np.array([len(route) for route in routes], dtype=np.int64)
+    arrays["route_start"] = np.cumsum(arrays["route_len"]) - arrays["route_len"]
+
+    return arrays
+
+# Calculamos con NumPy la mejor relocalizacion de un conjunto de tiendas
+# a la vez (mismo calculo que best_relocation)
+# candidates: indices (dentro de los arreglos store_*) de las tiendas a evaluar
+# Regresa los arreglos (costo, posicion de la mejor arista) por tienda
+# Funcionamiento:
+# Para un bloque de tiendas se juntan los renglones de la matriz de
+# distancias y se obtiene una matriz tiendas x aristas con el costo de
+# insertar cada tienda en cada arista:
+#   d(d, tienda) + d(tienda, e) - d(d, e)
+# Las aristas que tocan a la propia tienda se descartan. El bloque se limita
+# a block_size elementos para no crear matrices enormes.
+# Si se da una memoria tabu, los movimientos tabu en la iteracion dada se
+# descartan salvo que su costo sea menor que aspiration (criterio de aspiracion)
+def best_relocations_vectorized(arrays, cost, distances, candidates, block_size=1 << 22,
+                                tabu=None, iteration=0, aspiration=float('-inf')):
+    edge_from = arrays["edge_from"]
+    edge_to = arrays["edge_to"]
+    edge_route = arrays["edge_route"]
+    edge_pos = arrays["edge_pos"]
+    edge_cost = np.asarray(distances[edge_from, edge_to], dtype=np.float64)
+
+    best_costs = np.empty(len(candidates))
+    best_edges = np.empty(len(candidates), dtype=np.int64)
+    rows = max(1, block_size // max(1, len(edge_from)))
+
+    for start in range(0, len(candidates), rows):
+        block = candidates[start:start + rows]
+        store = arrays["store_node"][block]
+        a = arrays["store_prev"][block]
+        c = arrays["store_next"][block]
+        route = arrays["store_route"][block]
+        pos = arrays["store_pos"][block]
+
+        # Ganancia por quitar la tienda de su ruta
+        removal = distances[a, c] - (distances[a, store] + distances[store, c])
+
+        # Costo de insertarla en cada arista
+        insertion = distances[edge_from[None, :], store[:, None]] + distances[store[:, None], edge_to[None, :]]
+        insertion = np.asarray(insertion, dtype=np.float64) - edge_cost[None, :]
+
+        invalid = (edge_route[None, :] == route[:, None]) & \
+                  ((edge_pos[None, :] == pos[:, None]) | (edge_pos[None, :] == pos[:, None] - 1))
+        insertion[invalid] = np.inf
+
+        if tabu is not None:
+            forbidden = tabu.move_mask(store, arrays["edge_route"], iteration)
+            forbidden &= (cost + removal[:, None] + insertion) >= aspiration
+            insertion[forbidden] = np.inf
+
+        best = np.argmin(insertion, axis=1)
+        best_edges[start:start + len(block)] = best
+        best_costs[start:start + len(block)] = cost + removal + insertion[np.arange(len(block)), best]
+
+    return (best_costs, best_edges)
+
+# Calculamos las listas de los k vecinos mas cercanos de cada nodo
+# (sin contarse a si mismo), por bloques de renglones de la matriz
+# Regresa una matriz N x k con los indices de los vecinos
+def nearest_neighbors(distances, k, block_size=1 << 22):
+    N = distances.shape[0]
+    k = min(k, N - 1)
+    neighbors = np.empty((N, k), dtype=np.int64)
+    rows = max(1, block_size // N)
+
+    for start in range(0, N, rows):
+        block = np.arange(start, min(N, start + rows))
+        dist = np.array(distances[block], dtype=np.float64)
+        dist[np.arange(len(block)), block] = np.inf
+
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(dist, nearest, axis=1), axis=1)
+        neighbors[block] = np.take_along_axis(nearest, order, axis=1)
+
+    return neighbors
+
+# Version granular de best_relocations_vectorized: cada tienda solo se
+# prueba junto a sus k vecinos mas cercanos, es decir, en la arista que
+# sale de cada vecino (insertar despues de el) y en la que llega a el
+# (insertar antes de el). Son 2k aristas por tienda en lugar de todas,
+# por lo que una iteracion cuesta O(n * k) en lugar de O(n^2)
+# neighbors: matriz N x k de nearest_neighbors
+def best_relocations_granular(arrays, cost, distances, candidates, neighbors,
+                              tabu=None, iteration=0, aspiration=float('-inf')):
+    edge_from = arrays["edge_from"]
+    edge_to = arrays["edge_to"]
+    edge_route = arrays["edge_route"]
+    edge_pos = arrays["edge_pos"]
+
+    store = arrays["store_node"][candidates]
+    a = arrays["store_prev"][candidates]
+    c = arrays["store_next"][candidates]
+    route = arrays["store_route"][candidates]
+    pos = arrays["store_pos"][candidates]
+
+    removal = distances[a, c] - (distances[a, store] + distances[store, c])
+
+    # Aristas candidatas: la que sale de cada vecino y la anterior a el
+    after = arrays["node_edge"][neighbors[store]]
+    before_route = edge_route[after]
+    before = arrays["route_start"][before_route] + \
+             (edge_pos[after] - 1) % arrays["route_len"][before_route]
+    edges = np.concatenate((after, before), axis=1)
+
+    d = edge_from[edges]
+    e = edge_to[edges]
+    insertion = distances[d, store[:, None]] + distances[store[:, None], e] - distances[d, e]
+    insertion = np.asarray(insertion, dtype=np.float64)
+
+    invalid = (edge_route[edges] == route[:, None]) & \
+              ((edge_pos[edges] == pos[:, None]) | (edge_pos[edges] == pos[:, None] - 1))
+    insertion[invalid] = np.inf
+
+    if tabu is not None:
+        forbidden = tabu.move_mask(store, edge_route[edges], iteration)
+        forbidden &= (cost + removal[:, None] + insertion) >= aspiration
+        insertion[forbidden] = np.inf
+
+    best = np.argmin(insertion, axis=1)
+    rows = np.arange(len(candidates))
+    best_costs = cost + removal + insertion[rows, best]
+
+    return (best_costs, edges[rows, best])
+
+# Memoria tabu por atributos: guarda la iteracion en la que expira cada
+# atributo, por lo que revisar si un movimiento es tabu cuesta O(1)
+# Atributos:
+# "store": la tienda que se movio no puede volver a moverse
+# "store_route": la tienda no puede regresar a la ruta de la que salio
+class TabuMemory:
+
+    # N: numero de nodos, routes_count: numero de rutas
+    # tenure: iteraciones que dura un atributo tabu, entero o tupla
+    # (minimo, maximo) para una duracion aleatoria
+    def __init__(self, N, routes_count, tenure, attribute="store", rng=random):
+        if isinstance(tenure, int):
+            tenure = (tenure, tenure)
+
+        self.min_tenure = tenure[0]
+        self.max_tenure = tenure[1]
+        self.attribute = attribute
+        self.rng = rng
+
+        if attribute == "store":
+            self.expiry = np.full(N, -1, dtype=np.int64)
+        elif attribute == "store_route":
+            self.expiry = np.full((N, routes_count), -1, dtype=np.int64)
+        else:
+            raise ValueError(f"Atributo tabu desconocido: {attribute}")
+
+    # Registramos que la tienda salio de route_or en la iteracion dada
+    def add(self, store, route_or, iteration):
+        tenure = self.rng.randint(self.min_tenure, self.max_tenure)
+        if self.attribute == "store":
+            self.expiry[store] = iteration + tenure
+        else:
+            self.expiry[store, route_or] = iteration + tenure
+
+    # Regresa True si mover la tienda a la ruta route es tabu
+    def is_tabu(self, store, route, iteration):
+        if self.attribute == "store":
+            return self.expiry[store] >= iteration
+        return self.expiry[store, route] >= iteration
+
+    # Version vectorizada: matriz tiendas x aristas que indica que
+    # insertar cada tienda en la ruta de cada arista es tabu
+    # edge_route puede ser un arreglo de rutas comun a todas las tiendas
+    # o una matriz con las rutas de las aristas candidatas de cada tienda
+    def move_mask(self, stores, edge_route, iteration):
+        shape = (len(stores), edge_route.shape[-1])
+        if self.attribute == "store":
+            return np.broadcast_to((self.expiry[stores] >= iteration)[:, None], shape).copy()
+
+        tabu = self.expiry[stores] >= iteration
+        if edge_route.ndim == 1:
+            return tabu[:, edge_route]
+        return np.take_along_axis(tabu, edge_route, axis=1)
+
+    # Version vectorizada elemento a elemento: indica si mover cada
+    # tienda dentro de su ruta (routes) es tabu
+    def element_mask(self, stores, routes, iteration):
+        if self.attribute == "store":
+            return self.expiry[stores] >= iteration
+        return self.expiry[stores, routes] >= iteration
+
+# Construimos el indice tienda -> (ruta, posicion) de una solucion
+# N es el numero total de nodos (centros y tiendas)
+def build_store_index(routes, N):
+    route_of = [-1] * N
+    pos_of = [-1] * N
+    for i in range(len(routes)):
+        update_store_index(routes, i, route_of, pos_of)
+    return (route_of, pos_of)
+
+# Actualizamos el indice de los nodos de una sola ruta
+def update_store_index(routes, route, route_of, pos_of, start=0):
+    nodes = routes[route]
+    for j in range(start, len(nodes)):
+        route_of[nodes[j]] = route
+        pos_of[nodes[j]] = j
+
+# Aplicamos un movimiento directamente sobre las rutas (sin copiarlas):
+# solo cambian las dos rutas afectadas, y en el indice solo se actualizan
+# las posiciones que se recorrieron a partir de donde se quito o inserto
+def apply_move(routes, movs, route_of, pos_of):
     (route_or, pos_or, route_tg, pos_tg) = movs
-    store = routes[route_or][pos_or]
-
-    new_routes = [row[:] for row in routes]
+    store = routes[route_or].pop(pos_or)
 
     if route_or != route_tg or pos_or > pos_tg:
         pos_tg += 1
 
-    new_routes[route_or].pop(pos_or)
-    new_routes[route_tg].insert(pos_tg, store)
-
-    return new_routes
-
-# Generamos el mejor vecino posible dado una solucion anterior
-def generate_best_neighbor(routes, cost, centers, distances, tabu_stores):
+    routes[route_tg].insert(pos_tg, store)
+
+    if route_or == route_tg:
+        update_store_index(routes, route_or, route_of, pos_of, min(pos_or, pos_tg))
+    else:
+        update_store_index(routes, route_or, route_of, pos_of, pos_or)
+        update_store_index(routes, route_tg, route_of, pos_of, pos_tg)
+
+# Aplicamos un movimiento de la busqueda en el lugar: rutas, indice, libro
+# de costos y memoria tabu. Recibe reubicaciones y movimientos de
+# OperadoresIntraRuta; delta es su cambio de costo (solo para 2-opt y Or-opt)
+def apply_search_move(routes, movs, delta, ledger, tabu, route_of, pos_of, iteration):
+    if movs[0] in ("2opt", "oropt"):
+        ledger.apply_delta(movs[1], delta)
+        for store in OperadoresIntraRuta.apply_intra_move(routes, movs, route_of, pos_of):
+            tabu.add(store, movs[1], iteration)
+    else:
+        (route_or, pos_or, _, _) = movs
+        tabu.add(routes[route_or][pos_or], route_or, iteration)
+        ledger.apply_relocation(routes, movs)
+        apply_move(routes, movs, route_of, pos_of)
+
+# Reubicacion al azar de una tienda (para diversificar), sin revisar su
+# costo ni la memoria tabu. Regresa movs o () si no hay ninguna posible
+def random_relocation(routes, centers, route_of, pos_of, attempts=100):
+    N = len(route_of)
+    for _ in range(attempts):
+        store = random.randrange(centers, N)
+        (route_or, pos_or) = (route_of[store], pos_of[store])
+        route_tg = random.randrange(len(routes))
+        pos_tg = random.randrange(len(routes[route_tg]))
+
+        # Las aristas que tocan a la tienda no cambian la solucion
+        if route_tg == route_or and pos_tg in (pos_or, pos_or - 1):
+            continue
+        return (route_or, pos_or, route_tg, pos_tg)
+
+    return ()
+
+# Buscamos el mejor movimiento posible dado una solucion, sin construir
+# el vecino. Regresa (costo del vecino, movs)
+# tabu: memoria tabu (TabuMemory), los movimientos tabu solo se aceptan
+# si su costo es menor que aspiration
+# vectorized: evaluar todas las tiendas a la vez con NumPy en lugar de
+# llamar a best_relocation por cada tienda
+# neighbors: listas de vecinos cercanos (nearest_neighbors), si se dan
+# se usa el vecindario granular (solo con vectorized)
+# arrays: arreglos de relocation_arrays si ya se calcularon
+# evaluator: EvaluadorParalelo para repartir las tiendas entre varios
+# procesos (solo con vectorized)
+def best_neighbor_move(routes, cost, centers, distances, tabu, iteration, aspiration=float('-inf'),
+                       vectorized=True, neighbors=None, arrays=None, evaluator=None):
     best_cost = float('inf')
     movs = ()
-    for i in range(centers):
-        for j in range(1, len(routes[i])):
-            if(routes[i][j] in tabu_stores):
-                continue
-
-            (cost_act, movs_act) = best_relocation(routes, cost, centers, distances, (i, j))
-            if cost_act < best_cost:
-                best_cost = cost_act
-                movs = movs_act
-
-    best_neighbor = generate_neighbor(routes, movs)
-
-    (route_or, pos_or, _, _) = movs
-    tabu_stores.append(routes[route_or][pos_or])
-
-    return (best_neighbor, best_cost)   
+    if vectorized:
+        if arrays is None:
+            arrays = relocation_arrays(routes)
+        candidates = np.arange(len(arrays["store_node"]), dtype=np.int64)
+        if len(candidates) == 0:
+            return (best_cost, movs)
+
+        if evaluator is not None:
+            (best_cost, store, edge) = evaluator.best_relocation(arrays, cost, iteration, aspiration,
+                                                                 neighbors is not None)
+            if best_cost < float('inf'):
+                movs = (int(arrays["store_route"][store]), int(arrays["store_pos"][store]),
+                        int(arrays["edge_route"][edge]), int(arrays["edge_pos"][edge]))
+            return (best_cost, movs)
+
+        if neighbors is not None:
+            (best_costs, best_edges) = best_relocations_granular(arrays, cost, distances, candidates, neighbors,
+                                                                 tabu, iteration, aspiration)
+        else:
+            (best_costs, best_edges) = best_relocations_vectorized(arrays, cost, distances, candidates,
+                                                                   tabu=tabu, iteration=iteration,
+                                                                   aspiration=aspiration)
+
+        best = int(np.argmin(best_costs))
+        store = candidates[best]
+        edge = best_edges[best]
+        if best_costs[best] < float('inf'):
+            best_cost = float(best_costs[best])
+            movs = (int(arrays["store_route"][store]), int(arrays["store_pos"][store]),
+                    int(arrays["edge_route"][edge]), int(arrays["edge_pos"][edge]))
+    else:
+        for i in range(centers):
+            for j in range(1, len(routes[i])):
+                (cost_act, movs_act) = best_relocation(routes, cost, centers, distances, (i, j),
+                                                       tabu, iteration, aspiration)
+                if cost_act < best_cost:
+                    best_cost = cost_act
+                    movs = movs_act
+
+    return (best_cost, movs)
 
 # Busqueda de solucion pro tabu
-def solve(centers, stores, distances):
+# max_time: tiempo maximo de busqueda en segundos
+# target_cost: si se alcanza un costo menor o igual se detiene la busqueda
+# check_every: cada cuantas iteraciones se recalculan todos los costos para
+# corregir el error acumulado de las actualizaciones incrementales
+# vectorized: evaluar el vecindario con NumPy (ver best_neighbor_move)
+# tenure: iteraciones que dura un movimiento tabu (entero o tupla (minimo,
+# maximo) para duracion aleatoria), por defecto N // 10
+# tabu_attribute: "store" o "store_route" (ver TabuMemory)
+# aspiration: aceptar movimientos tabu que mejoren best_cost
+# granular_k: si se da, solo se evaluan inserciones junto a los k vecinos
+# mas cercanos de cada tienda, con un barrido completo cada full_every
+# iteraciones
+# operators: movimientos a evaluar en cada iteracion, "relocate" (mover una
+# tienda), "2opt" y "oropt" (ver OperadoresIntraRuta.py); se aplica el mejor
+# workers: si es mayor que 1, las reubicaciones se evaluan en un pool de
+# ese numero de procesos con la matriz en memoria compartida (ver
+# EvaluacionParalela.py)
+# exchange: funcion exchange(best_routes, best_cost) que se llama cada
+# exchange_every iteraciones; si regresa unas rutas la busqueda continua
+# desde ellas (la usa island_solve para compartir la solucion elite)
+# initial_routes: rutas para empezar en lugar de la solucion aleatoria
+# (se adaptan a las tiendas actuales con repair_routes)
+# checkpoint: archivo .npz donde se guarda un punto de control cada
+# checkpoint_every iteraciones y al terminar (ver PuntosControl.py)
+# resume: si el archivo checkpoint existe, continuar la busqueda desde el
+# (rutas, memoria tabu, generador aleatorio e iteracion)
+# stats: diccionario opcional donde se guarda el numero de iteraciones,
+# las mejoras encontradas como (segundos desde el inicio, costo) y las
+# veces que se detecto un ciclo (revisits)
+# visited_size: si se da, se guarda el hash de las ultimas visited_size
+# soluciones visitadas (ver MemoriaLargoPlazo.py); cuando el mejor
+# movimiento lleva a una solucion ya visitada la busqueda esta ciclando:
+# el movimiento no se aplica y en su lugar se diversifica con
+# diversify_moves reubicaciones al azar (por defecto 5% de las tiendas)
+def solve(centers, stores, distances, max_time=10.0, target_cost=None, check_every=1000,
+          vectorized=True, tenure=None, tabu_attribute="store", aspiration=True,
+          granular_k=None, full_every=50, operators=("relocate", "2opt", "oropt"), workers=None,
+          exchange=None, exchange_every=200, initial_routes=None, checkpoint=None,
+          checkpoint_every=1000, resume=False, stats=None, visited_size=None, diversify_moves=None):
     N = centers + stores
-    # Generar solucion inicial y su costo
-    act_routes = generate_initial_solve(centers, stores, distances)
-    act_cost = calculate_cost(act_routes, centers, distances)
-
-    # Tomar la solucion inicial como la mejor
-    best_routes = act_routes
+    # Generar solucion inicial (o tomarla del punto de control o de las
+    # rutas dadas) y su costo real con el libro de costos
+    state = None
+    if checkpoint is not None and resume and os.path.exists(checkpoint):
+        state = PuntosControl.load_checkpoint(checkpoint)
+        random.setstate(state["rng_state"])
+        act_routes = decode_routes(state["routes"], centers)
+    elif initial_routes is not None:
+        act_routes = repair_routes(initial_routes, centers, stores, distances)
+    else:
+        act_routes = generate_initial_solve(centers, stores, distances)
+    ledger = RouteCostLedger(act_routes, distances)
+    act_cost = ledger.total
+
+    # Las rutas actuales se modifican en el lugar, el indice nos dice
+    # en que ruta y posicion esta cada tienda
+    (route_of, pos_of) = build_store_index(act_routes, N)
+
+    # Tomar la solucion inicial como la mejor (como copia, porque
+    # act_routes se seguira modificando)
+    best_routes = [row[:] for row in act_routes]
     best_cost = act_cost
+    if state is not None:
+        best_routes = decode_routes(state["best_routes"], centers)
+        best_cost = state["best_cost"]
 
     # Registrar el costo (se hara por cada iteracion)
     steps = [act_cost]
 
-    # Crearemos la cola tabu, donde guardaremos las tiendas que no se usen
-    max_tabu = N // 10
-    tabu_stores = deque()
-
-    # Definimos un maximo de iteraciones permitidos 
-    # sin mejora
+    # Crearemos la memoria tabu, donde guardaremos hasta que iteracion
+    # no se pueden usar las tiendas (o las parejas tienda, ruta)
+    if tenure is None:
+        tenure = max(1, N // 10)
+    tabu = TabuMemory(N, centers, tenure, tabu_attribute)
+    if state is not None:
+        if state["tabu_attribute"] != tabu_attribute or state["tabu_expiry"].shape != tabu.expiry.shape:
+            raise ValueError(f"El punto de control {checkpoint} no corresponde a esta instancia")
+        tabu.expiry[...] = state["tabu_expiry"]
+
+    # Listas de vecinos cercanos, se calculan una sola vez
+    neighbors = None
+    if granular_k is not None:
+        neighbors = nearest_neighbors(distances, granular_k)
+
+    # La busqueda escalar (vectorized=False) indexa la matriz elemento por
+    # elemento, lo que es mucho mas rapido sobre listas de Python que sobre
+    # un arreglo de NumPy o un memmap, asi que se convierte una sola vez
+    move_distances = distances if vectorized else np.asarray(distances).tolist()
+
+    # Pool de procesos, vive durante toda la busqueda
+    evaluator = None
+    if vectorized and workers is not None and workers > 1:
+        evaluator = EvaluadorParalelo(distances, tabu, relocation_arrays(act_routes), neighbors, workers)
+
+    # Definimos el tiempo maximo de busqueda
     start_time = time.time()
-    max_time=10.0
+    iteration = state["iteration"] if state is not None else 0
+
+    if stats is None:
+        stats = {}
+    stats["improvements"] = [(0.0, best_cost)]
+    stats["revisits"] = 0
+
+    # Memoria de largo plazo con el hash de la solucion actual
+    visited = None
+    if visited_size is not None:
+        visited = MemoriaLargoPlazo.VisitedTable(visited_size)
+        act_hash = MemoriaLargoPlazo.solution_hash(act_routes)
+        visited.add(act_hash)
+        if diversify_moves is None:
+            diversify_moves = max(1, stores // 20)
+
+    try:
+        while time.time() - start_time < max_time:
+            if target_cost is not None and best_cost <= target_cost:
+                break
+
+            iteration += 1
+            aspiration_cost = best_cost if aspiration else float('-inf')
+            granular = neighbors if iteration % full_every != 0 else None
+            arrays = relocation_arrays(act_routes)
+
+            # Evaluamos cada operador y nos quedamos con el mejor movimiento
+            (neighbor_cost, movs) = (float('inf'), ())
+            if "relocate" in operators:
+                (neighbor_cost, movs) = best_neighbor_move(act_routes, act_cost, centers, move_distances, tabu,
+                                                           iteration, aspiration_cost, vectorized, granular,
+                                                           arrays, evaluator)
+            if "2opt" in operators:
+                (cost_act, movs_act) = OperadoresIntraRuta.best_two_opt(arrays, act_cost, distances, granular,
+                                                                       tabu, iteration, aspiration_cost)
+                if cost_act < neighbor_cost:
+                    (neighbor_cost, movs) = (cost_act, movs_act)
+            if "oropt" in operators:
+                (cost_act, movs_act) = OperadoresIntraRuta.best_or_opt(arrays, act_cost, distances, granular,
+                                                                      tabu, iteration, aspiration_cost)
+                if cost_act < neighbor_cost:
+                    (neighbor_cost, movs) = (cost_act, movs_act)
+
+            if not movs:
+                break
+
+            # Actualizamos solo las rutas afectadas (costos, rutas e indice)
+            # y cada tanto recalculamos todo para no acumular error
+            if visited is None:
+                apply_search_move(act_routes, movs, neighbor_cost - act_cost, ledger, tabu, route_of, pos_of,
+                                  iteration)
+            else:
+                # Si el movimiento regresa a una solucion conocida estamos
+                # ciclando: diversificamos con reubicaciones al azar
+                new_hash = MemoriaLargoPlazo.apply_delta(act_hash, act_routes, movs)
+                if new_hash in visited:
+                    stats["revisits"] += 1
+                    for _ in range(diversify_moves):
+                        kick = random_relocation(act_routes, centers, route_of, pos_of)
+                        if kick:
+                            act_hash = MemoriaLargoPlazo.apply_delta(act_hash, act_routes, kick)
+                            apply_search_move(act_routes, kick, 0.0, ledger, tabu, route_of, pos_of, iteration)
+                else:
+                    act_hash = new_hash
+                    apply_search_move(act_routes, movs, neighbor_cost - act_cost, ledger, tabu, route_of, pos_of,
+                                      iteration)
+                visited.add(act_hash)
+
+            if iteration % check_every == 0:
+                ledger.recompute(act_routes)
+
+            act_cost = ledger.total
+
+            # Solo copiamos las rutas cuando encontramos una nueva mejor solucion
+            if act_cost < best_cost:
+                best_cost = act_cost
+                best_routes = [row[:] for row in act_routes]
+                stats["improvements"].append((time.time() - start_time, best_cost))
+
+            steps.append(act_cost)
+
+            # Intercambio con las demas busquedas: si nos dan una solucion
+            # mejor, reconstruimos las rutas, el libro de costos y el indice
+            if exchange is not None and iteration % exchange_every == 0:
+                elite_routes = exchange(best_routes, best_cost)
+                if elite_routes is not None:
+                    act_routes = elite_routes
+                    ledger = RouteCostLedger(act_routes, distances)
+                    act_cost = ledger.total
+                    (route_of, pos_of) = build_store_index(act_routes, N)
+                    if visited is not None:
+                        act_hash = MemoriaLargoPlazo.solution_hash(act_routes)
+                        visited.add(act_hash)
+                    if act_cost < best_cost:
+                        best_cost = act_cost
+                        best_routes = [row[:] for row in act_routes]
+                        stats["improvements"].append((time.time() - start_time, best_cost))
+
+            if checkpoint is not None and iteration % checkpoint_every == 0:
+                write_checkpoint(checkpoint, act_routes, act_cost, best_routes, best_cost, iteration, tabu)
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+
+    stats["iterations"] = len(steps) - 1
+
+    if checkpoint is not None:
+        write_checkpoint(checkpoint, act_routes, act_cost, best_routes, best_cost, iteration, tabu)
 
-    while time.time() - start_time < max_time:
-        (best_neighbor, neighbor_cost) = generate_best_neighbor(act_routes, act_cost, centers, distances, tabu_stores)
+    return (best_routes, best_cost, steps)
 
-        if neighbor_cost < best_cost:
-            best_cost = neighbor_cost
-            best_routes = best_neighbor
+# Guardamos el estado de la busqueda en un punto de control
+def write_checkpoint(path, act_routes, act_cost, best_routes, best_cost, iteration, tabu):
+    PuntosControl.save_checkpoint(path, {
+        "routes": encode_routes(act_routes),
+        "best_routes": encode_routes(best_routes),
+        "cost": act_cost,
+        "best_cost": best_cost,
+        "iteration": iteration,
+        "tabu_expiry": tabu.expiry,
+        "tabu_attribute": tabu.attribute,
+        "rng_state": random.getstate(),
+    })
+
+# Representamos unas rutas como una sola lista con las rutas seguidas;
+# como cada ruta empieza con su centro (ids menores que centers) se
+# pueden separar de nuevo sin guardar sus largos
+def encode_routes(routes):
+    return [node for route in routes for node in route]
+
+def decode_routes(flat, centers):
+    routes = []
+    for node in flat:
+        if node < centers:
+            routes.append([node])
+        else:
+            routes[-1].append(node)
+    return routes
 
-        if len(tabu_stores) > max_tabu:
-            tabu_stores.popleft()
+# Elite compartida por los procesos de island_solve, se recibe al crear
+# cada proceso del pool junto con la matriz (init_distances_worker)
+island = {}
+
+def init_island(distances_spec, elite_routes, elite_cost, elite_lock):
+    init_distances_worker(distances_spec)
+    island["routes"] = elite_routes
+    island["cost"] = elite_cost
+    island["lock"] = elite_lock
+
+# Intercambio con la solucion elite global: si la mejor solucion de la isla
+# es mejor que la elite la publicamos; si es peor, la isla continua desde
+# una copia de la elite
+def exchange_elite(centers, best_routes, best_cost):
+    with island["lock"]:
+        if best_cost < island["cost"].value:
+            island["cost"].value = best_cost
+            island["routes"][:] = encode_routes(best_routes)
+            return None
+        if best_cost > island["cost"].value:
+            return decode_routes(island["routes"][:], centers)
+    return None
+
+# Busqueda que corre cada proceso del pool, con su propia semilla y hasta
+# la hora limite comun. Regresa el numero de isla junto con sus resultados
+def island_worker(centers, stores, index, seed, deadline, exchange_every, solve_args):
+    random.seed(seed)
+    max_time = max(0.0, deadline - time.time())
+    exchange = lambda routes, cost: exchange_elite(centers, routes, cost)
+
+    (routes, cost, steps) = solve(centers, stores, distances_state["distances"], max_time,
+                                  exchange=exchange, exchange_every=exchange_every, **solve_args)
+
+    # Publicamos la mejor solucion final para que la vean las islas
+    # que sigan corriendo
+    exchange_elite(centers, routes, cost)
+    return (index, routes, cost, steps)
+
+# Corre varias busquedas tabu (islas) en procesos separados que comparten
+# un mismo tiempo total y, cada exchange_every iteraciones, la mejor
+# solucion encontrada hasta el momento (elite)
+# Parametros de entrada:
+# islands: numero de islas (None usa todos los nucleos)
+# seeds: semillas de cada isla (por defecto 0..islands - 1)
+# max_time: tiempo total de la busqueda en segundos, lo comparten todas
+#   las islas
+# solve_args: parametros extra para solve (tenure, granular_k, ...)
+# Retorna:
+# (best_routes, best_cost, traces), donde traces es un diccionario
+#   numero de isla -> steps con el registro de costos de cada isla (la
+#   isla i usa seeds[i])
+def island_solve(centers, stores, distances, islands=None, seeds=None, max_time=10.0,
+                 exchange_every=200, **solve_args):
+    deadline = time.time() + max_time
+    if seeds is None:
+        islands = islands if islands is not None else multiprocessing.cpu_count()
+        seeds = list(range(islands))
 
-        act_routes = best_neighbor
-        act_cost = neighbor_cost
-        steps.append(act_cost)
+    N = centers + stores
+    context = multiprocessing.get_context()
+    elite_routes = context.Array('i', N, lock=False)
+    elite_cost = context.Value('d', float('inf'), lock=False)
+    elite_lock = context.Lock()
+    (block, distances_spec) = share_distances(distances)
 
-    return (best_routes, best_cost, steps)
+    best_routes = None
+    best_cost = float('inf')
+    traces = {}
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(seeds), mp_context=context, initializer=init_island,
+                                 initargs=(distances_spec, elite_routes, elite_cost, elite_lock)) as pool:
+            futures = [pool.submit(island_worker, centers, stores, i, seed, deadline, exchange_every, solve_args)
+                       for (i, seed) in enumerate(seeds)]
+
+            for future in futures:
+                (i, routes, cost, steps) = future.result()
+                traces[i] = steps
+                if cost < best_cost:
+                    best_cost = cost
+                    best_routes = routes
+    finally:
+        block.close()
+        block.unlink()
+
+    return (best_routes, best_cost, traces)
 
 def main():
     distances = read_distances()
@@ -165,12 +888,13 @@ def main():
     # Imprimir resultados
     print("Mejor ruta encontrada: ")
     print(routes)
-    print("Costo de la ruta: " + str(cost))
+    print("Costo de la ruta: " + str(float(cost)))
 
     # Imprimir resultados de primeras 10 iteraciones
     # y de ultimas 10 iteraciones
-    print(steps[:10])
-    print(steps[-10:])
+    print([float(c) for c in steps[:10]])
+    print([float(c) for c in steps[-10:]])
 
 
-main()
+if __name__ == "__main__":
+    main()
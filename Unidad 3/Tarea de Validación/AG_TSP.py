@@ -12,8 +12,12 @@ import matplotlib.pyplot as plt
 class municipio:
     """
     Representa una entidad 'municipio' (o ciudad) con coordenadas 2D.
-    Almacena las coordenadas 'x' e 'y' y calcula distancias.
+    Es solo un registro con las coordenadas 'x' e 'y' para la entrada de
+    datos y las gráficas; el AG trabaja con índices de municipios sobre la
+    matriz de distancias (ver matrizDistancias).
     """
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         """
         Inicializa un nuevo municipio.
@@ -46,96 +50,112 @@ class municipio:
         return "(" + str(self.x) + "," + str(self.y) + ")"
 
 
+def matrizDistancias(listaMunicipios):
+    """
+    Precalcula la matriz de distancias Euclidianas entre todos los
+    municipios. Se llena una sola vez al iniciar con 'municipio.distancia',
+    así cada distancia tiene exactamente el mismo redondeo que al
+    calcularla entre los objetos.
+    
+    @param listaMunicipios: La lista de objetos 'municipio'.
+    @return: Un arreglo de NumPy de n x n donde [i, j] es la distancia
+             entre el municipio i y el municipio j.
+    """
+    return np.array([[origen.distancia(destino) for destino in listaMunicipios]
+                     for origen in listaMunicipios], dtype=float)
+
+
 class Aptitud:
     """
-    Calcula la aptitud (fitness) de una ruta (individuo).
+    Calcula la aptitud (fitness) de las rutas (individuos) de una población.
     La aptitud es inversamente proporcional a la distancia total de la ruta.
     """
-    def __init__(self, ruta):
+    def __init__(self, rutas, distancias):
         """
-        Inicializa el objeto de aptitud para una ruta específica.
+        Inicializa el objeto de aptitud para un conjunto de rutas.
         
-        @param ruta: Una lista de objetos 'municipio' que define una ruta.
+        @param rutas: Una matriz (individuos x municipios) donde cada
+                      renglón es una permutación de los índices de los
+                      municipios.
+        @param distancias: La matriz de distancias (ver matrizDistancias).
         """
-        self.ruta = ruta
-        self.distancia = 0
-        self.f_aptitud = 0.0
+        self.rutas = np.asarray(rutas)
+        self.distancias = distancias
+        self.distancia = None
+        self.f_aptitud = None
     
     def distanciaRuta(self):
         """
-        Calcula la distancia total de la ruta, incluyendo el regreso
-        al punto de partida. Utiliza memoización simple para evitar
-        recálculos.
+        Calcula la distancia total de cada ruta, incluyendo el regreso
+        al punto de partida. Los tramos (ruta[i], ruta[i + 1]) de todas
+        las rutas se toman de la matriz de distancias en una sola consulta.
+        Utiliza memoización simple para evitar recálculos.
         
-        @return: La distancia total (float) de la ruta.
+        @return: Un arreglo con la distancia total (float) de cada ruta.
         """
-        if self.distancia == 0:
-            distanciaRelativa = 0
-            for i in range(0, len(self.ruta)):
-                puntoInicial = self.ruta[i]
-                puntoFinal = None
-                
-                # Comprueba si es el último punto para volver al inicio
-                if i + 1 < len(self.ruta):
-                    puntoFinal = self.ruta[i + 1]
-                else:
-                    puntoFinal = self.ruta[0] 
-                
-                distanciaRelativa += puntoInicial.distancia(puntoFinal)
-            self.distancia = distanciaRelativa
+        if self.distancia is None:
+            # np.roll pone al punto de partida al final para cerrar el ciclo
+            tramos = self.distancias[self.rutas, np.roll(self.rutas, -1, axis=1)]
+            # cumsum suma los tramos en orden, uno por uno, así el
+            # redondeo (y el desempate entre rutas) es el mismo que al
+            # sumarlos en un ciclo
+            self.distancia = tramos.cumsum(axis=1)[:, -1]
         return self.distancia
     
     def rutaApta(self):
         """
-        Calcula la puntuación de aptitud (fitness score) de la ruta.
+        Calcula la puntuación de aptitud (fitness score) de cada ruta.
         La aptitud es el inverso de la distancia (1 / distancia).
         
-        @return: El valor de aptitud (float).
+        @return: Un arreglo con el valor de aptitud (float) de cada ruta.
         """
-        if self.f_aptitud == 0:
+        if self.f_aptitud is None:
             # La aptitud es el inverso de la distancia.
             # Rutas más cortas tienen mayor aptitud.
-            self.f_aptitud = 1 / float(self.distanciaRuta())
+            self.f_aptitud = 1 / self.distanciaRuta()
         return self.f_aptitud
 
 # -------------------------------------------------------------------
 #                Funciones del Algoritmo Genético
 # -------------------------------------------------------------------
 
-def crearRuta(listaMunicipios):
+def crearRuta(numMunicipios):
     """
-    Crea una ruta aleatoria (una permutación) a partir de la lista
-    de municipios.
+    Crea una ruta aleatoria (una permutación de los índices de los
+    municipios).
     
-    @param listaMunicipios: La lista de todos los municipios a visitar.
-    @return: Una lista (ruta) con un orden aleatorio de municipios.
+    @param numMunicipios: El número de municipios a visitar.
+    @return: Una lista (ruta) con un orden aleatorio de los índices
+             0..numMunicipios - 1.
     """
-    ruta = random.sample(listaMunicipios, len(listaMunicipios))
+    ruta = random.sample(range(numMunicipios), numMunicipios)
     return ruta
 
-def poblacionInicial(tamanoPob, listaMunicipios):
+def poblacionInicial(tamanoPob, numMunicipios):
     """
     Crea la población inicial de rutas aleatorias.
     
     @param tamanoPob: El número de individuos (rutas) en la población.
-    @param listaMunicipios: La lista base de municipios.
+    @param numMunicipios: El número de municipios a visitar.
     @return: Una lista de rutas (población).
     """
     poblacion = []
     for i in range(0, tamanoPob):
-        poblacion.append(crearRuta(listaMunicipios))
+        poblacion.append(crearRuta(numMunicipios))
     return poblacion
 
-def clasificacionRutas(poblacion):
+def clasificacionRutas(poblacion, distancias):
     """
     Evalúa y clasifica todas las rutas en la población según su aptitud.
+    La aptitud de toda la población se calcula a la vez con 'Aptitud'
+    sobre la matriz (individuos x municipios) de la población.
     
     @param poblacion: La lista de rutas (individuos).
+    @param distancias: La matriz de distancias (ver matrizDistancias).
     @return: Una lista ordenada (descendente) de tuplas (índice, aptitud).
     """
-    fitnessResults = {}
-    for i in range(0, len(poblacion)):
-        fitnessResults[i] = Aptitud(poblacion[i]).rutaApta()
+    aptitudes = Aptitud(np.array(poblacion), distancias).rutaApta()
+    fitnessResults = dict(enumerate(aptitudes.tolist()))
         
     # Ordena por valor de aptitud de mayor a menor
     return sorted(fitnessResults.items(), key = operator.itemgetter(1), reverse = True)
@@ -216,7 +236,8 @@ def reproduccion(progenitor1, progenitor2):
         hijoP1.append(progenitor1[i])
         
     # Rellena el resto con genes del progenitor 2 (evitando duplicados)
-    hijoP2 = [item for item in progenitor2 if item not in hijoP1]
+    enHijoP1 = set(hijoP1)
+    hijoP2 = [item for item in progenitor2 if item not in enHijoP1]
 
     # Concatena las dos partes para formar el hijo completo
     hijo = hijoP1 + hijoP2
@@ -282,7 +303,7 @@ def mutacionPoblacion(poblacion, razonMutacion):
         pobMutada.append(individuoMutar)
     return pobMutada
 
-def nuevaGeneracion(generacionActual, indivSelecionados, razonMutacion):
+def nuevaGeneracion(generacionActual, indivSelecionados, razonMutacion, distancias):
     """
     Orquesta la creación de una nueva generación completa, ejecutando
     los pasos de clasificación, selección, reproducción y mutación.
@@ -290,10 +311,11 @@ def nuevaGeneracion(generacionActual, indivSelecionados, razonMutacion):
     @param generacionActual: La población de la generación actual.
     @param indivSelecionados: El tamaño del elitismo.
     @param razonMutacion: La probabilidad de mutación.
+    @param distancias: La matriz de distancias (ver matrizDistancias).
     @return: La nueva generación de individuos.
     """
     # Clasificar rutas por aptitud
-    popRanked = clasificacionRutas(generacionActual)
+    popRanked = clasificacionRutas(generacionActual, distancias)
     
     # Seleccionar los mejores candidatos con elitismo + ruleta
     selectionResults = seleccionRutas(popRanked, indivSelecionados)
@@ -319,14 +341,19 @@ def algoritmoGenetico(poblacion, tamanoPoblacion, indivSelecionados, razonMutaci
     @param razonMutacion: Probabilidad de mutación.
     @param generaciones: Número total de generaciones a ejecutar.
     @return: Una tupla (mejorRuta, progreso), donde 'mejorRuta' es la
-             mejor ruta encontrada y 'progreso' es una lista con la
-             mejor distancia de cada generación.
+             mejor ruta encontrada (lista de objetos 'municipio') y
+             'progreso' es una lista con la mejor distancia de cada
+             generación.
     """
+    # Precalcula las distancias; los individuos son permutaciones de
+    # índices sobre esta matriz
+    distancias = matrizDistancias(poblacion)
+
     # Inicializa la población
-    pop = poblacionInicial(tamanoPoblacion, poblacion)
+    pop = poblacionInicial(tamanoPoblacion, len(poblacion))
     
     # Calcula la distancia inicial para referencia
-    distanciaInicial = 1 / clasificacionRutas(pop)[0][1]
+    distanciaInicial = 1 / clasificacionRutas(pop, distancias)[0][1]
     print("Distancia Inicial: " + str(distanciaInicial))
     
     progreso = []
@@ -335,13 +362,16 @@ def algoritmoGenetico(poblacion, tamanoPoblacion, indivSelecionados, razonMutaci
 
     # Itera a través de las generaciones
     for i in range(0, generaciones):
-        pop = nuevaGeneracion(pop, indivSelecionados, razonMutacion)
+        pop = nuevaGeneracion(pop, indivSelecionados, razonMutacion, distancias)
         # Registra la mejor distancia de esta generación
-        progreso.append(1 / clasificacionRutas(pop)[0][1])
+        progreso.append(1 / clasificacionRutas(pop, distancias)[0][1])
     
-    print("Distancia Final: " + str(1 / clasificacionRutas(pop)[0][1]))
-    bestRouteIndex = clasificacionRutas(pop)[0][0]
-    mejorRuta = pop[bestRouteIndex]
+    popRanked = clasificacionRutas(pop, distancias)
+    print("Distancia Final: " + str(1 / popRanked[0][1]))
+    bestRouteIndex = popRanked[0][0]
+
+    # Traduce los índices de la mejor ruta a sus municipios para graficar
+    mejorRuta = [poblacion[i] for i in pop[bestRouteIndex]]
     
     return mejorRuta, progreso
 